@@ -1,24 +1,56 @@
 import streamlit as st
 import os
-import base64
-from src.document_loader import load_document
-from src.chunk_and_embed import chunk_documents, embed_and_store
+import hashlib
+import threading
+import uuid
 from dotenv import load_dotenv
-import torch
-from src.quiz_generator import generate_mcqs
-from src.flashcard_generator import generate_flashcards
-from src.summarizer import summarize_document
-from datetime import datetime
-from src.dummy_data import generate_dummy_pdf
-
-torch._C._jit_set_profiling_mode(False)
+from src.telemetry import start_metrics_server
+from src.job_queue import submit_job, get_job, cancel_job, ACTIVE_STATUSES
+from src.resources import optional_module, preload_modules
+
+# Streamlit runs this whole script on every interaction, so only light modules are imported up here.
+# Everything that pulls in torch, LangChain, FAISS or ReportLab is loaded through app_module() on first use.
+
 load_dotenv()
 
+# Imported in the background at server start, in the order they are usually needed
+PRELOAD_MODULES = ("src.index_cache", "src.study_jobs", "src.qa", "src.pdf_renderer")
+
+def app_module(module_name):
+    # One import per server process; a missing third-party package disables the feature, not the whole app.
+    # Other import errors are bugs and show up with their traceback.
+    module = optional_module(module_name)
+    if module is None:
+        st.error(f"This feature isn't available: a package it needs is not installed ({module_name}). "
+                 "Install requirements.txt and restart the app.")
+        st.stop()
+    return module
+
+# Once per server process, in the background so the first page renders right away:
+# heavy modules first, then the embedding model
+@st.cache_resource
+def start_background_warm_up():
+    def warm_up():
+        if os.getenv("STUDYMATE_PRELOAD_MODULES", "1") == "1":
+            preload_modules(PRELOAD_MODULES)
+        if os.getenv("STUDYMATE_WARMUP_EMBEDDINGS", "1") == "1":
+            embedding_models = optional_module("src.embedding_models")
+            if embedding_models is not None:
+                embedding_models.warm_up_embedding_models()
+
+    threading.Thread(target=warm_up, name="app-warm-up", daemon=True).start()
+    # Prometheus-style /metrics, the same numbers are also written to metrics/studymate.prom
+    if os.getenv("STUDYMATE_METRICS_PORT"):
+        start_metrics_server(int(os.getenv("STUDYMATE_METRICS_PORT")))
+    return True
+
+start_background_warm_up()
+
 # Sesstion states
 if 'document_processed' not in st.session_state:
     st.session_state.document_processed = False
-if 'vector_db' not in st.session_state:
-    st.session_state.vector_db = None
+if 'index_key' not in st.session_state:
+    st.session_state.index_key = None
 if 'selected_mode' not in st.session_state:
     st.session_state.selected_mode = None
 if 'study_mode_selected' not in st.session_state:
@@ -35,45 +67,131 @@ if 'file_already_uploaded' not in st.session_state:
     st.session_state.file_already_uploaded = False
 if 'current_filename' not in st.session_state:
     st.session_state.current_filename = None
+# Background job ids, so a rerun picks up the job where it left off instead of starting it again
+for job_state_key in ("process_job_id", "flashcards_job_id", "quiz_job_id", "summary_job_id", "study_pack_job_id"):
+    if job_state_key not in st.session_state:
+        st.session_state[job_state_key] = None
+
+# How often running jobs are polled for progress
+JOB_POLL_SECONDS = 1.0
 
 st.set_page_config(page_title="AI StudyMate", layout="wide")
 
+# Index for this session, reloaded from disk if it was spilled out of memory
+def current_vector_db():
+    try:
+        return app_module("src.index_manager").get_index(st.session_state.index_key)
+    except KeyError:
+        st.session_state.index_key = None
+        st.session_state.document_processed = False
+        st.warning("Your processed document expired, please process it again.")
+        st.stop()
+
+# PDF bytes for the download button, read from the render cache once instead of on every rerun.
+# The path is a hash of the summary, so a cached entry never goes stale.
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_summary_pdf(pdf_path):
+    with open(pdf_path, "rb") as f:
+        return f.read()
+
+# Progress, partial output and a cancel button for a background job.
+# The polling fragment is only rendered while a job is tracked, so idle sections don't rerun every second.
+def job_status(state_key, label, on_done, show_partial=None):
+    if st.session_state[state_key] is not None:
+        poll_job_status(state_key, label, on_done, show_partial)
+
+# Only this fragment reruns while polling; the whole page reruns once when the job is done.
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_job_status(state_key, label, on_done, show_partial=None):
+    job_id = st.session_state[state_key]
+    if job_id is None:
+        return
+
+    job = get_job(job_id)
+    if job is None:
+        # Server restarted before the job finished
+        st.session_state[state_key] = None
+        st.warning(f"{label} was interrupted, please try again.")
+        return
+
+    if job["status"] in ACTIVE_STATUSES:
+        st.progress(job["progress"], text=job["message"] or f"{label}...")
+        if show_partial is not None and job["partial"]:
+            show_partial(job["partial"])
+        if st.button("✖️ Cancel", key=f"cancel_{state_key}"):
+            cancel_job(job_id)
+        return
+
+    st.session_state[state_key] = None
+    if job["status"] == "done":
+        on_done(job["result"])
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error(f"{label} failed: {job['error']}")
+    else:
+        st.info(f"{label} cancelled.")
+
+def save_upload(uploaded_file):
+    # Saved once under its content hash: a job reads exactly the bytes its dedupe key was built from,
+    # and neither a rerun nor another user's upload with the same name can change the file under it
+    data = uploaded_file.getbuffer()
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    save_path = os.path.join("data", hashlib.sha256(data).hexdigest() + extension)
+    if not os.path.exists(save_path):
+        tmp_path = f"{save_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, save_path)
+    return save_path
+
 # File upload handler
-def handle_file_upload(uploaded_file):
-    if not uploaded_file:
+def handle_file_upload(uploaded_files):
+    if not uploaded_files:
         return
     
-    # Check file uploaded is new
+    # Check files uploaded are new
     new_file_uploaded = False
-    if st.session_state.current_filename != uploaded_file.name:
-        st.session_state.current_filename = uploaded_file.name
+    file_names = ", ".join(sorted(f.name for f in uploaded_files))
+    if st.session_state.current_filename != file_names:
+        st.session_state.current_filename = file_names
         new_file_uploaded = True
     
     if not os.path.exists("data"):
         os.makedirs("data")
 
-    save_path = os.path.join("data", uploaded_file.name)
-    with open(save_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+    save_paths = [save_upload(uploaded_file) for uploaded_file in uploaded_files]
     
     if new_file_uploaded:
-        st.toast(f"Uploaded file: {uploaded_file.name}", icon="ℹ️")
+        st.toast(f"Uploaded: {file_names}", icon="ℹ️")
 
-    # Load & parse document
+    # Load, chunk & embed the documents in the background
     try:
-        docs = load_document(save_path)
-        
         if st.button("🔍 Process & Embed Text"):
-            with st.spinner("Chunking and embedding..."):
-                chunks = chunk_documents(docs)
-                vector_db = embed_and_store(chunks)
-                st.session_state.vector_db = vector_db
-                st.session_state.document_processed = True
-                st.toast("Processing complete! Your document is ready.", icon="✅")
+            # Same files with the same settings map to the same job, a second click doesn't start another one
+            index_cache_key = app_module("src.index_cache").index_cache_key
+            dedupe_key = "process:" + "|".join(index_cache_key(save_path) for save_path in save_paths)
+            st.session_state.process_job_id = submit_job(
+                "process",
+                app_module("src.study_jobs").process_documents_job,
+                save_paths,
+                document_name=uploaded_files[0].name if len(save_paths) == 1 else None,
+                dedupe_key=dedupe_key
+            )
+            st.session_state.document_processed = False
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
         st.session_state.document_processed = False
 
+    def on_processed(result):
+        # Only the key lives in the session; the index manager holds the index itself
+        st.session_state.index_key = result["index_key"]
+        st.session_state.document_processed = True
+        if result["cache_hit"]:
+            st.toast("Loaded previously processed documents.", icon="⚡")
+        st.toast("Processing complete! Your documents are ready.", icon="✅")
+
+    job_status("process_job_id", "Processing", on_processed)
+
 # HEADER SECTION CONTAINER
 with st.container():
     st.image("assets/app-banner.png", width=1500)
@@ -84,15 +202,19 @@ with st.container():
 
     st.write('')
 
-    uploaded_file = st.file_uploader("Upload a study file (.pdf or .docx)", type = ["pdf", "docx"])
-    handle_file_upload(uploaded_file)
+    uploaded_files = st.file_uploader(
+        "Upload your study files (.pdf or .docx)",
+        type = ["pdf", "docx"],
+        accept_multiple_files = True
+    )
+    handle_file_upload(uploaded_files)
 
 
 # STUDY FEATURES CONTAINER
 with st.container():
     st.write('')
     st.subheader("Choose a study method", divider="gray")
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
 
     with col1:
         flashcard_card = st.container(border=True)
@@ -100,7 +222,7 @@ with st.container():
             st.markdown("### 🃏 Flashcards")
             st.markdown("Study with interactive flashcards generated from your notes.")
             if st.button("Start Flashcards", key="flashcards_btn"):
-                if st.session_state.document_processed and st.session_state.vector_db is not None:
+                if st.session_state.document_processed and st.session_state.index_key is not None:
                     st.session_state.selected_mode = "flashcards"
                     st.session_state.study_mode_selected = True
                 else:
@@ -112,7 +234,7 @@ with st.container():
             st.markdown("### 🧠 Quiz")
             st.markdown("Test your knowledge with multiple-choice questions.")
             if st.button("Start Quiz", key="quiz_btn"):
-                if st.session_state.document_processed and st.session_state.vector_db is not None:
+                if st.session_state.document_processed and st.session_state.index_key is not None:
                     st.session_state.selected_mode = "quiz"
                     st.session_state.study_mode_selected = True
                 else:
@@ -124,7 +246,7 @@ with st.container():
             st.markdown("### 🤔 Ask Me")
             st.markdown("Ask questions and I'll reply based on your notes.")
             if st.button("Start Asking", key="ask_btn"):
-                if st.session_state.document_processed and st.session_state.vector_db is not None:
+                if st.session_state.document_processed and st.session_state.index_key is not None:
                     st.session_state.selected_mode = "ask"
                     st.session_state.study_mode_selected = True
                 else:
@@ -136,12 +258,24 @@ with st.container():
             st.markdown("### 📋 Summarize")
             st.markdown("Generate document with summary of notes.")
             if st.button("Start Summarizing", key="summarize_btn"):
-                if st.session_state.document_processed and st.session_state.vector_db is not None:
+                if st.session_state.document_processed and st.session_state.index_key is not None:
                     st.session_state.selected_mode = "summarize"
                     st.session_state.study_mode_selected = True
                 else:
                     st.toast("Please upload and process a document first.", icon="⚠️")
 
+    with col5:
+        pack_card = st.container(border=True)
+        with pack_card:
+            st.markdown("### 🎒 Study Pack")
+            st.markdown("Get flashcards, a quiz and a summary in one go.")
+            if st.button("Build Study Pack", key="study_pack_btn"):
+                if st.session_state.document_processed and st.session_state.index_key is not None:
+                    st.session_state.selected_mode = "study_pack"
+                    st.session_state.study_mode_selected = True
+                else:
+                    st.toast("Please upload and process a document first.", icon="⚠️")
+
 
 # Handle study feature click only if document is processed 
 if st.session_state.study_mode_selected == True:
@@ -154,19 +288,27 @@ if st.session_state.study_mode_selected == True:
         
         with col1:
             num_cards = st.slider("Number of flashcards to generate:", 5, 15, 8)
+            regenerate_cards = st.checkbox("🔄 Regenerate (ignore cached results)", key="regen_flashcards")
         
         with col2:
             if st.button("Generate Flashcards", key="gen_flashcards_btn"):
-                with st.spinner("Generating flashcards from your notes..."):
-                    # Generate flashcards
-                    st.session_state.flashcards = generate_flashcards(
-                        st.session_state.vector_db, 
-                        num_cards=num_cards
-                    )
+                current_vector_db()
+                st.session_state.flashcards_job_id = submit_job(
+                    "flashcards",
+                    app_module("src.study_jobs").flashcards_job,
+                    st.session_state.index_key,
+                    num_cards,
+                    use_cache=not regenerate_cards,
+                    dedupe_key=f"flashcards:{st.session_state.index_key}:{num_cards}:{not regenerate_cards}"
+                )
 
-                    st.session_state.current_card_index = 0
-                    st.session_state.show_answer = False
-                st.toast("Flashcards generated!", icon="✨")
+        def on_flashcards_done(result):
+            st.session_state.flashcards = result
+            st.session_state.current_card_index = 0
+            st.session_state.show_answer = False
+            st.toast("Flashcards generated!", icon="✨")
+
+        job_status("flashcards_job_id", "Generating flashcards", on_flashcards_done)
         
         # Display flashcards if they exist
         if isinstance(st.session_state.flashcards, list) and len(st.session_state.flashcards) > 0:
@@ -239,6 +381,7 @@ if st.session_state.study_mode_selected == True:
         
         with col1:
             num_mcqs = st.slider("Number of questions to generate:", 5, 15, 8)
+            regenerate_mcqs = st.checkbox("🔄 Regenerate (ignore cached results)", key="regen_mcqs")
         
         with col2:
             if 'mcqs_generated' not in st.session_state:
@@ -246,15 +389,22 @@ if st.session_state.study_mode_selected == True:
                 
             generate_mcqs_btn = st.button("Generate Questions", key="generate_mcqs_btn")
             if generate_mcqs_btn:
-                with st.spinner("Generating flashcards from your notes..."):
-                    # Generate mcqs
-                    st.session_state.questions = generate_mcqs(
-                        st.session_state.vector_db,
-                        num_mcqs = num_mcqs
-                    )  
-                       
-                st.session_state.mcqs_generated = True
-                st.toast("MCQs generated!", icon="✨")
+                current_vector_db()
+                st.session_state.quiz_job_id = submit_job(
+                    "quiz",
+                    app_module("src.study_jobs").quiz_job,
+                    st.session_state.index_key,
+                    num_mcqs,
+                    use_cache = not regenerate_mcqs,
+                    dedupe_key = f"quiz:{st.session_state.index_key}:{num_mcqs}:{not regenerate_mcqs}"
+                )
+
+        def on_quiz_done(result):
+            st.session_state.questions = result
+            st.session_state.mcqs_generated = True
+            st.toast("MCQs generated!", icon="✨")
+
+        job_status("quiz_job_id", "Generating questions", on_quiz_done)
 
         if 'questions' in st.session_state and isinstance(st.session_state.questions, list) and len(st.session_state.questions) > 0:
             st.write("Quiz questions below...")
@@ -337,6 +487,47 @@ if st.session_state.study_mode_selected == True:
         st.subheader("🤔 Ask Me Anything", divider="green")
         user_question = st.text_input("Ask a question about your notes:", placeholder = 'e.g. What is the formula of the Pythagorean Theorem?')
 
+        with st.expander("Retrieval settings"):
+            num_sources = st.slider("Number of note sections to use:", 1, 10, 4, key="ask_k")
+            use_mmr = st.checkbox("Prefer diverse sections (MMR re-rank)", key="ask_mmr")
+
+        if 'last_answer' not in st.session_state:
+            st.session_state.last_answer = None
+
+        if st.button("Ask", key="ask_question_btn") and user_question.strip():
+            sources, answer_stream, timings = app_module("src.qa").answer_question(
+                current_vector_db(),
+                user_question,
+                k=num_sources,
+                use_mmr=use_mmr
+            )
+            answer_container = st.container(border=True)
+            with answer_container:
+                answer_text = st.write_stream(answer_stream)
+
+            st.session_state.last_answer = {
+                "question": user_question,
+                "answer": answer_text,
+                "sources": [doc.page_content for doc in sources],
+                "timings": dict(timings),
+            }
+        elif st.session_state.last_answer:
+            answer_container = st.container(border=True)
+            with answer_container:
+                st.markdown(st.session_state.last_answer["answer"])
+
+        if st.session_state.last_answer:
+            timings = st.session_state.last_answer["timings"]
+            st.caption(
+                f"Embed {timings['embed'] * 1000:.0f} ms · "
+                f"Search {timings['search'] * 1000:.0f} ms · "
+                f"First token {timings.get('first_token', 0) * 1000:.0f} ms · "
+                f"LLM {timings.get('llm', 0):.2f} s"
+            )
+            with st.expander("Sources from your notes"):
+                for source in st.session_state.last_answer["sources"]:
+                    st.markdown(f"> {source}")
+
 
     # summarize selected
     elif st.session_state.selected_mode == "summarize":
@@ -346,33 +537,132 @@ if st.session_state.study_mode_selected == True:
             st.session_state.summary = None
         if 'summary_pdf_path' not in st.session_state:
             st.session_state.summary_pdf_path = None
+        if 'summary_title' not in st.session_state:
+            st.session_state.summary_title = "Document Summary"
 
         doc_title = st.text_input("Document Title:", placeholder="Enter a title for your summary")
+        summary_scope = st.radio(
+            "Summary scope:",
+            ["Quick (most relevant sections)", "Whole document"],
+            horizontal=True,
+            key="summary_scope"
+        )
+        regenerate_summary = st.checkbox("🔄 Regenerate (ignore cached results)", key="regen_summary")
 
         if st.button("Generate Summary", key="gen_summary_btn"):
-            with st.spinner("Generating comprehensive summary of your document..."):
-                # Generate summary and PDF
-                summary_text, pdf_path = summarize_document(
-                    st.session_state.vector_db, 
-                    doc_title=doc_title if doc_title else "Document Summary"
-                )
-
-                st.session_state.summary = summary_text
-                st.session_state.summary_pdf_path = pdf_path
-                
-                st.toast("Summary generated successfully!", icon="✅")
+            current_vector_db()
+            title = doc_title if doc_title else "Document Summary"
+            whole_document = summary_scope == "Whole document"
+            st.session_state.summary_title = title
+            st.session_state.summary_job_id = submit_job(
+                "summary",
+                app_module("src.study_jobs").summary_job,
+                st.session_state.index_key,
+                title,
+                whole_document=whole_document,
+                use_cache=not regenerate_summary,
+                dedupe_key=f"summary:{st.session_state.index_key}:{title}:{whole_document}:{not regenerate_summary}"
+            )
+
+        def show_partial_summary(summary_text):
+            # The summary shows up on the page as it's written, the PDF is built from the same text
+            with st.container(border=True):
+                st.markdown(summary_text)
+
+        def on_summary_done(result):
+            st.session_state.summary = result["summary"]
+            st.session_state.summary_pdf_path = result["pdf_path"]
+            st.toast("Summary generated successfully!", icon="✅")
+
+        job_status("summary_job_id", "Summarizing", on_summary_done, show_partial=show_partial_summary)
 
         # Display summary and PDF if they exist
         if st.session_state.summary and st.session_state.summary_pdf_path:
-            # PDF preview & download
-            st.subheader("PDF Summary", divider="gray")
-            
-            with open(st.session_state.summary_pdf_path, "rb") as f:
-                base64_pdf = base64.b64encode(f.read()).decode('utf-8')
-            
-            # Display PDF
-            pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="100%" height="500" type="application/pdf"></iframe>'
-            st.markdown(pdf_display, unsafe_allow_html=True)
+            with st.container(border=True):
+                st.markdown(st.session_state.summary)
+
+            # Served as a file download: the PDF is no longer base64-inlined into the page on every rerun
+            if not os.path.exists(st.session_state.summary_pdf_path):
+                # Pruned from the render cache since it was generated
+                st.session_state.summary_pdf_path = app_module("src.pdf_renderer").get_summary_pdf(st.session_state.summary, st.session_state.summary_title)
+            st.download_button(
+                "📄 Download PDF Summary",
+                data=load_summary_pdf(st.session_state.summary_pdf_path),
+                file_name=f"{st.session_state.summary_title}.pdf",
+                mime="application/pdf",
+                key="download_summary_pdf"
+            )
 
         else:
-            st.info("Click 'Generate Summary' to create a summary PDF from your notes!")
\ No newline at end of file
+            st.info("Click 'Generate Summary' to create a summary PDF from your notes!")
+
+
+    # study pack selected
+    elif st.session_state.selected_mode == "study_pack":
+        st.subheader("🎒 Study Pack", divider="green")
+
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            pack_num_cards = st.slider("Number of flashcards:", 5, 15, 8, key="pack_num_cards")
+        with col2:
+            pack_num_mcqs = st.slider("Number of questions:", 5, 15, 8, key="pack_num_mcqs")
+        pack_title = st.text_input("Summary Title:", placeholder="Enter a title for your summary", key="pack_title")
+        regenerate_pack = st.checkbox("🔄 Regenerate (ignore cached results)", key="regen_pack")
+
+        status_labels = {
+            "flashcards": "🃏 Flashcards",
+            "quiz": "🧠 Quiz",
+            "summary": "📋 Summary",
+        }
+
+        if st.button("Generate Study Pack", key="gen_study_pack_btn"):
+            current_vector_db()
+            title = pack_title if pack_title else "Document Summary"
+            st.session_state.study_pack_status = None
+            st.session_state.summary_title = title
+            st.session_state.study_pack_job_id = submit_job(
+                "study_pack",
+                app_module("src.study_jobs").study_pack_job,
+                st.session_state.index_key,
+                pack_num_cards,
+                pack_num_mcqs,
+                title,
+                use_cache=not regenerate_pack,
+                dedupe_key=f"study_pack:{st.session_state.index_key}:{pack_num_cards}:{pack_num_mcqs}:{title}:{not regenerate_pack}"
+            )
+
+        # Results show up as each LLM call finishes
+        def show_pack_status(results):
+            for name, label in status_labels.items():
+                if name not in results:
+                    st.info(f"{label}: generating...")
+                elif results[name]["error"] is not None:
+                    st.error(f"{label}: failed ({results[name]['error']})")
+                elif name == "flashcards":
+                    st.success(f"{label}: {len(results[name]['result'])} cards ready")
+                elif name == "quiz":
+                    st.success(f"{label}: {len(results[name]['result'])} questions ready")
+                else:
+                    st.success(f"{label}: ready")
+
+        def on_study_pack_done(results):
+            # One failed call shouldn't throw away the others
+            ready = {name: item["result"] for name, item in results.items() if item["error"] is None}
+            if "flashcards" in ready:
+                st.session_state.flashcards = ready["flashcards"]
+                st.session_state.current_card_index = 0
+                st.session_state.show_answer = False
+            if "quiz" in ready:
+                st.session_state.questions = ready["quiz"]
+                st.session_state.mcqs_generated = True
+            if "summary" in ready:
+                st.session_state.summary, st.session_state.summary_pdf_path = ready["summary"]
+            st.session_state.study_pack_status = results
+            st.toast("Study pack generated! Open each study method to use it.", icon="✨")
+
+        job_status("study_pack_job_id", "Generating study pack", on_study_pack_done, show_partial=show_pack_status)
+
+        if st.session_state.get("study_pack_status"):
+            show_pack_status(st.session_state.study_pack_status)
+        elif st.session_state.study_pack_job_id is None:
+            st.info("Click 'Generate Study Pack' to create flashcards, a quiz and a summary at once!")
\ No newline at end of file
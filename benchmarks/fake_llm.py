@@ -0,0 +1,83 @@
+import json
+import re
+import threading
+import time
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeChatOpenAI:
+    # Offline stand-in for langchain_openai.ChatOpenAI: same constructor arguments,
+    # invoke() / stream() with a fixed delay before the first token and per token after it.
+    # Answers with valid flashcard / MCQ JSON or plain summary text depending on the prompt.
+
+    latency = 0.5
+    token_latency = 0.0
+    calls = 0
+    _calls_lock = threading.Lock()
+
+    def __init__(self, model="gpt-3.5-turbo", temperature=0.7, **kwargs):
+        self.model_name = model
+        self.temperature = temperature
+
+    def invoke(self, messages):
+        return FakeChunk("".join(self._pieces(messages)))
+
+    def stream(self, messages):
+        for piece in self._pieces(messages):
+            yield FakeChunk(piece)
+
+    def _pieces(self, messages):
+        with FakeChatOpenAI._calls_lock:
+            FakeChatOpenAI.calls += 1
+        time.sleep(self.latency)
+
+        text = fake_response(messages)
+        for piece in re.findall(r"\S+\s*", text):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield piece
+
+
+def fake_response(messages):
+    system = messages[0].content if messages else ""
+    prompt = "\n".join(message.content for message in messages)
+    count = _requested_count(system)
+    words = re.findall(r"[A-Za-z]{5,}", prompt.split("STUDY CONTENT:", 1)[-1])[:200] or ["topic"]
+
+    if "flashcards" in system:
+        return json.dumps([
+            {"front": f"What is {words[i % len(words)]} number {i}?", "back": f"It is {words[(i + 1) % len(words)]}."}
+            for i in range(count)
+        ])
+    if "multiple choice" in system:
+        return json.dumps([
+            {
+                "question": f"Which term goes with {words[i % len(words)]} ({i})?",
+                "options": {letter: words[(i + offset) % len(words)] for offset, letter in enumerate("ABCD")},
+                "correct_option": "A",
+            }
+            for i in range(count)
+        ])
+    # Summaries and answers: a few short paragraphs made of the input's own words
+    return "\n\n".join(" ".join(words[start:start + 25]) for start in range(0, min(len(words), 100), 25))
+
+
+def install_fake_llm(latency=0.5, token_latency=0.0):
+    # Every generator gets its client from the LLM gateway, so swapping the class there is enough.
+    # Calls still go through the gateway's rate limiter, retries and single-flight.
+    from src import llm_gateway
+    FakeChatOpenAI.latency = latency
+    FakeChatOpenAI.token_latency = token_latency
+    with llm_gateway._clients_lock:
+        llm_gateway._clients.clear()
+    llm_gateway.ChatOpenAI = FakeChatOpenAI
+    return FakeChatOpenAI
+
+
+def _requested_count(system):
+    match = re.search(r"Generate (\d+)", system)
+    return int(match.group(1)) if match else 5
@@ -0,0 +1,147 @@
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.fake_llm import fake_response
+
+# Local stand-in for the OpenAI chat completions endpoint, to exercise the LLM gateway end to end:
+#   python -m benchmarks.mock_openai_server --port 8001 --latency 0.3 --error-rate 0.2
+#   STUDYMATE_LLM_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=test streamlit run app.py
+# Answers like benchmarks.fake_llm, and fails a share of requests with 429 + Retry-After.
+
+
+class Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.3
+    token_latency = 0.0
+    error_rate = 0.0
+    retry_after = 1
+    stats = {"requests": 0, "rate_limited": 0, "connections": 0}
+    stats_lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # Kept-alive connections are reused, so this stays low when the client pools connections
+        with self.stats_lock:
+            self.stats["connections"] += 1
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.stats_lock:
+                self._send_json(200, dict(self.stats))
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            rate_limited = random.random() < self.error_rate
+            if rate_limited:
+                self.stats["rate_limited"] += 1
+        if rate_limited:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"Retry-After": str(self.retry_after)}
+            )
+            return
+
+        time.sleep(self.latency)
+        text = fake_response([Message(message.get("content", "")) for message in request.get("messages", [])])
+        model = request.get("model", "gpt-3.5-turbo")
+        if request.get("stream"):
+            self._stream(model, text)
+        else:
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+    def _stream(self, model, text):
+        # Server-sent events, one chunk per word
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        pieces = [{"role": "assistant", "content": ""}] + [{"content": word + " "} for word in text.split(" ")]
+        for delta in pieces:
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            self._write_event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            })
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_event(self, payload):
+        self._write_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(port=0, latency=0.3, token_latency=0.0, error_rate=0.0, retry_after=1):
+    # Returns the running server on a daemon thread; its URL is http://127.0.0.1:<server.server_port>/v1.
+    # Counters start from zero for each server.
+    MockOpenAIHandler.latency = latency
+    MockOpenAIHandler.token_latency = token_latency
+    MockOpenAIHandler.error_rate = error_rate
+    MockOpenAIHandler.retry_after = retry_after
+    MockOpenAIHandler.stats = {"requests": 0, "rate_limited": 0, "connections": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockOpenAIHandler)
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI chat completions API.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    server = start_mock_server(args.port, args.latency, args.token_latency, args.error_rate, args.retry_after)
+    print(f"Mock OpenAI API on http://127.0.0.1:{server.server_port}/v1 (GET /stats for counters)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from src.chunk_and_embed import chunk_documents, embed_and_store, CHUNKER
+from src.document_loader import load_document
+from src.embedding_models import get_embedding_model, embedding_model_stats
+from src.flashcard_generator import generate_flashcards
+from src.quiz_generator import generate_mcqs
+from src.summarizer import summarize_document
+from src.map_reduce_summarizer import summarize_full_document
+from src.qa import retrieve_for_question
+from src.telemetry import current_rss_bytes, peak_rss_bytes, cache_hit_rates
+from benchmarks.fake_llm import install_fake_llm
+from benchmarks.synthetic_docs import write_synthetic_pdf, TOPICS
+
+# python -m benchmarks.run_benchmarks [--pages 10 100 1000] [--compare benchmarks/results/<commit>.json]
+# Everything (documents, indexes, caches) is written to a temporary directory, so runs never
+# reuse a previous run's cache. LLM calls go to an offline stub with a fixed latency.
+
+DEFAULT_PAGES = (10, 100, 1000)
+RETRIEVAL_QUERIES = [f"What is the role of {word}?" for words in TOPICS.values() for word in words.split()[:3]]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Stages slower than baseline by more than this are flagged by --compare
+REGRESSION_RATIO = 1.2
+
+
+def run_benchmarks(page_counts=DEFAULT_PAGES, num_items=15, workdir=None):
+    results = []
+    workdir = workdir or tempfile.mkdtemp(prefix="studymate-bench-")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        # Model load is reported on its own, not inside the first embedding stage
+        start = time.perf_counter()
+        get_embedding_model().embed_query("warm up")
+        results.append({"pages": None, "stage": "embedding_model_load", "seconds": round(time.perf_counter() - start, 4)})
+
+        for pages in page_counts:
+            results.extend(_benchmark_document(pages, num_items))
+    finally:
+        os.chdir(previous_dir)
+    return results
+
+
+def _benchmark_document(pages, num_items):
+    path = write_synthetic_pdf(f"synthetic-{pages}.pdf", pages)
+    rows = []
+
+    def timed(stage, func, **extra):
+        start = time.perf_counter()
+        value = func()
+        rows.append({"pages": pages, "stage": stage, "seconds": round(time.perf_counter() - start, 4), **extra})
+        return value
+
+    documents = timed("load_document", lambda: load_document(path))
+    timed("load_document_cached", lambda: load_document(path))
+    chunks = timed("chunk_documents", lambda: chunk_documents(documents))
+    rows[-1]["chunks"] = len(chunks)
+    vector_db = timed("embed_and_store", lambda: embed_and_store(chunks, persist_path=os.path.join("db", str(pages))))
+
+    start = time.perf_counter()
+    for question in RETRIEVAL_QUERIES:
+        retrieve_for_question(vector_db, question)
+    rows.append({
+        "pages": pages,
+        "stage": "retrieval",
+        "seconds": round((time.perf_counter() - start) / len(RETRIEVAL_QUERIES), 6),
+        "queries": len(RETRIEVAL_QUERIES),
+    })
+
+    # use_cache=False: every run pays for the (fake) LLM calls
+    timed("generate_flashcards", lambda: generate_flashcards(vector_db, num_cards=num_items, use_cache=False))
+    timed("generate_mcqs", lambda: generate_mcqs(vector_db, num_mcqs=num_items, use_cache=False))
+    timed("summarize_document", lambda: summarize_document(vector_db, "Benchmark", use_cache=False))
+    timed("summarize_full_document", lambda: summarize_full_document(vector_db, use_cache=False))
+
+    rows.append({"pages": pages, "stage": "rss_mb", "value": round(current_rss_bytes() / (1024 * 1024), 1)})
+    rows.append({"pages": pages, "stage": "peak_rss_mb", "value": round(peak_rss_bytes() / (1024 * 1024), 1)})
+    return rows
+
+
+def compare_results(results, baseline):
+    # (pages, stage, baseline seconds, seconds, ratio) for every stage timed in both runs
+    baseline_seconds = {(row["pages"], row["stage"]): row["seconds"] for row in baseline["results"] if "seconds" in row}
+    rows = []
+    for row in results["results"]:
+        before = baseline_seconds.get((row["pages"], row["stage"]))
+        if "seconds" in row and before:
+            rows.append((row["pages"], row["stage"], before, row["seconds"], row["seconds"] / before))
+    return rows
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time ingestion, retrieval and generation on synthetic documents.")
+    parser.add_argument("--pages", type=int, nargs="+", default=list(DEFAULT_PAGES))
+    parser.add_argument("--items", type=int, default=15, help="flashcards / questions per generator call")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds before the fake LLM's first token")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per streamed token")
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    fake_llm = install_fake_llm(args.llm_latency, args.token_latency)
+    commit = _git_commit()
+    output = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{commit}.json"))
+
+    results = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "chunker": CHUNKER,
+            "items": args.items,
+            "llm_latency": args.llm_latency,
+            "token_latency": args.token_latency,
+        },
+        "results": run_benchmarks(args.pages, args.items),
+    }
+    results["llm_calls"] = fake_llm.calls
+    results["embedding"] = embedding_model_stats()
+    results["cache_hit_rates"] = cache_hit_rates()
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    for row in results["results"]:
+        print(json.dumps(row))
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline.get('commit', args.compare)}:")
+        regressions = 0
+        for pages, stage, before, after, ratio in compare_results(results, baseline):
+            flag = "  <-- slower" if ratio > REGRESSION_RATIO else ""
+            regressions += bool(flag)
+            print(f"{str(pages):>6} {stage:<26} {before:>9.4f}s -> {after:>9.4f}s  x{ratio:.2f}{flag}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+# python -m benchmarks.startup_benchmark [--budget 0.3] [--runs 5]
+# Checks app.py's startup cost, each measurement in a fresh interpreter so nothing is already imported:
+#   - the app's own top-level imports (after Streamlit itself) must stay under the import-time budget
+#     and must not pull in any of HEAVY_MODULES, which are only loaded on first use
+#   - with streamlit.testing available: cold first run of the script and a rerun, as a click triggers
+# Exits 1 when the budget is exceeded or a heavy module is imported at startup.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+# Seconds for app.py's imports on top of Streamlit's own
+IMPORT_BUDGET_SECONDS = float(os.getenv("STUDYMATE_IMPORT_BUDGET", "0.3"))
+HEAVY_MODULES = (
+    "torch", "transformers", "sentence_transformers", "faiss", "langchain", "langchain_community",
+    "langchain_openai", "reportlab", "tiktoken", "fitz", "pypdf",
+)
+
+_IMPORT_SNIPPET = """
+import importlib, json, sys, time
+import streamlit
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+seconds = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": seconds, "heavy": heavy}}))
+"""
+
+_APP_SNIPPET = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({app_path!r}, default_timeout=120)
+start = time.perf_counter()
+app.run()
+cold = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+errors = [element.value for element in app.exception]
+print(json.dumps({{"cold_run": cold, "rerun": rerun, "heavy": heavy, "errors": errors}}))
+"""
+
+
+def startup_imports(app_path=APP_PATH):
+    # Modules imported at the top level of the script, except Streamlit itself
+    modules = []
+    for node in ast.parse(open(app_path).read()).body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return [name for name in modules if name.split(".")[0] != "streamlit"]
+
+
+def measure_imports(modules, runs=5):
+    # Median over fresh interpreters, plus the heavy modules any run ended up importing
+    results = [_run_snippet(_IMPORT_SNIPPET.format(modules=modules, heavy=HEAVY_MODULES)) for _ in range(runs)]
+    seconds = sorted(result["seconds"] for result in results)
+    heavy = sorted({name for result in results for name in result["heavy"]})
+    return {"seconds": seconds[len(seconds) // 2], "heavy": heavy}
+
+
+def measure_app_runs(app_path=APP_PATH):
+    # None when streamlit.testing isn't available
+    try:
+        return _run_snippet(_APP_SNIPPET.format(app_path=app_path, heavy=HEAVY_MODULES))
+    except RuntimeError as e:
+        if "streamlit.testing" in str(e):
+            return None
+        raise
+
+
+def _run_snippet(snippet):
+    env = dict(os.environ, STUDYMATE_WARMUP_EMBEDDINGS="0", STUDYMATE_PRELOAD_MODULES="0")
+    process = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, cwd=ROOT, env=env)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "snippet failed")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check app.py's import time and startup cost against a budget.")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS, help="seconds for app.py's own imports")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    modules = startup_imports()
+    imports = measure_imports(modules, args.runs)
+    failed = False
+
+    print(f"Startup imports: {', '.join(modules)}")
+    print(f"Import time: {imports['seconds'] * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    if imports["seconds"] > args.budget:
+        print("  <-- over budget")
+        failed = True
+    if imports["heavy"]:
+        print(f"Heavy modules imported at startup: {', '.join(imports['heavy'])}")
+        failed = True
+
+    runs = measure_app_runs()
+    if runs is not None:
+        print(f"Cold script run: {runs['cold_run'] * 1000:.0f} ms, rerun: {runs['rerun'] * 1000:.0f} ms")
+        if runs["heavy"]:
+            print(f"Heavy modules imported by the first page: {', '.join(runs['heavy'])}")
+            failed = True
+        for error in runs["errors"]:
+            print(f"App error: {error}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import random
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+# A handful of topics with their own vocabulary, so the pages cluster like real notes do
+TOPICS = {
+    "geometry": "triangle hypotenuse angle theorem polygon radius circle vertex tangent parallel",
+    "mechanics": "velocity acceleration momentum inertia friction torque energy newton force gravity",
+    "biology": "photosynthesis chlorophyll mitochondria membrane enzyme protein nucleus organism cell tissue",
+    "history": "revolution empire treaty monarchy parliament colony republic dynasty battle constitution",
+    "economics": "inflation demand supply market equilibrium interest currency taxation budget monopoly",
+    "chemistry": "molecule electron covalent reaction catalyst oxidation solution compound isotope acid",
+}
+FILLER = "the of and is in that a which are to by with for as this from on".split()
+
+LINES_PER_PAGE = 40
+WORDS_PER_LINE = 12
+
+
+def synthetic_page_text(page_number, seed=0):
+    # Deterministic: the same page number and seed always give the same text
+    rng = random.Random(f"{seed}-{page_number}")
+    topic = list(TOPICS)[(page_number // 5) % len(TOPICS)]
+    vocabulary = TOPICS[topic].split()
+    lines = [f"{topic.title()} notes, page {page_number + 1}"]
+    for _ in range(LINES_PER_PAGE - 1):
+        words = [rng.choice(vocabulary) if rng.random() < 0.45 else rng.choice(FILLER) for _ in range(WORDS_PER_LINE)]
+        lines.append(" ".join(words).capitalize() + ".")
+    return lines
+
+
+def write_synthetic_pdf(path, pages, seed=0):
+    pdf = canvas.Canvas(path, pagesize=letter)
+    _, height = letter
+    for page_number in range(pages):
+        y = height - 50
+        for line in synthetic_page_text(page_number, seed):
+            pdf.drawString(50, y, line)
+            y -= 17
+        pdf.showPage()
+    pdf.save()
+    return path
@@ -0,0 +1,157 @@
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.chunk_and_embed import get_embeddings
+from src.coverage_sampler import sample_chunks
+from src.llm_cache import stream_cached
+
+# Items asked for per LLM call; more items means more calls in parallel, not one longer completion
+ITEMS_PER_CALL = 5
+MAX_PARALLEL_CALLS = 4
+MAX_ATTEMPTS = 3
+# Cosine similarity above which two generated items count as the same question
+DUPLICATE_SIMILARITY = 0.92
+
+_decoder = json.JSONDecoder()
+
+
+def generate_items(vector_db, prompt, llm, count_name, num_items, docs=None, use_cache=True,
+                   is_valid=None, dedupe_text=None, items_per_call=ITEMS_PER_CALL, max_workers=MAX_PARALLEL_CALLS):
+    # Fan-out generation of a JSON list of items (flashcards, questions...):
+    # the content is split into one chunk group per call, the calls run concurrently,
+    # each response is parsed object by object while it streams, and near-duplicate
+    # items across calls are dropped. A call that fails all its attempts only loses its share.
+    # `prompt` takes {content} and {<count_name>}; is_valid(item) filters malformed items;
+    # dedupe_text(item) is the text compared for duplicates.
+    if docs is None:
+        docs = sample_chunks(vector_db, num_items)
+    if not docs:
+        raise ValueError("No content to generate from.")
+
+    num_calls = max(1, min(math.ceil(num_items / items_per_call), len(docs)))
+    groups = _split_evenly(docs, num_calls)
+    counts = _split_count(num_items, num_calls)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(
+                _generate_batch,
+                prompt,
+                llm,
+                {"content": " ".join(doc.page_content for doc in group), count_name: count},
+                use_cache,
+                is_valid
+            )
+            for group, count in zip(groups, counts)
+        ]
+        batches = []
+        errors = []
+        for future in futures:
+            try:
+                batches.append(future.result())
+            except Exception as e:
+                errors.append(e)
+
+    items = [item for batch in batches for item in batch]
+    if not items:
+        raise ValueError(f"Could not generate any valid items: {errors[0] if errors else 'empty response'}")
+
+    if dedupe_text is not None and len(batches) > 1:
+        embeddings = getattr(vector_db, "embeddings", None) or get_embeddings()
+        items = dedupe_items(items, [dedupe_text(item) for item in items], embeddings)
+    return items[:num_items]
+
+
+def dedupe_items(items, texts, embeddings, threshold=DUPLICATE_SIMILARITY):
+    # Keeps the first of every group of items whose texts embed closer than `threshold`
+    if len(items) < 2:
+        return items
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype="float32")
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = vectors @ vectors.T
+
+    kept = []
+    for position in range(len(items)):
+        if not kept or similarity[position, kept].max() < threshold:
+            kept.append(position)
+    return [items[position] for position in kept]
+
+
+def iter_json_objects(pieces):
+    # Yields each complete top-level JSON object from a streamed JSON list as soon as it has arrived.
+    # Tolerant of code fences, text around the list and broken objects (skipped once the stream ends).
+    buffer = ""
+    cursor = 0
+    for piece in pieces:
+        buffer += piece
+        while True:
+            start = buffer.find("{", cursor)
+            if start == -1:
+                cursor = len(buffer)
+                break
+            try:
+                item, end = _decoder.raw_decode(buffer, start)
+            except json.JSONDecodeError:
+                # Most likely incomplete, wait for more text
+                cursor = start
+                break
+            yield item
+            cursor = end
+
+    # End of stream: whatever doesn't parse now never will, skip past it
+    while True:
+        start = buffer.find("{", cursor)
+        if start == -1:
+            return
+        try:
+            item, end = _decoder.raw_decode(buffer, start)
+        except json.JSONDecodeError:
+            cursor = start + 1
+            continue
+        yield item
+        cursor = end
+
+
+def parse_json_items(text, is_valid=None):
+    return [item for item in iter_json_objects([text]) if is_valid is None or is_valid(item)]
+
+
+def _generate_batch(prompt, llm, inputs, use_cache, is_valid):
+    # Retried until the response has at least one valid item. A stream that breaks half way
+    # still keeps the items parsed before the error.
+    def validate(text):
+        if not parse_json_items(text, is_valid):
+            raise ValueError("Response has no valid items")
+
+    last_error = None
+    for attempt in range(MAX_ATTEMPTS):
+        items = []
+        try:
+            # A retry must not get the same answer back from the cache
+            stream = stream_cached(prompt, llm, inputs, use_cache=use_cache and attempt == 0, validate=validate)
+            for item in iter_json_objects(stream):
+                if is_valid is None or is_valid(item):
+                    items.append(item)
+        except Exception as e:
+            last_error = e
+        if items:
+            return items
+    raise last_error or ValueError("Response has no valid items")
+
+
+def _split_evenly(values, parts):
+    # Contiguous groups in document order, so each call gets a different part of the notes
+    size, extra = divmod(len(values), parts)
+    groups = []
+    start = 0
+    for part in range(parts):
+        end = start + size + (1 if part < extra else 0)
+        groups.append(values[start:end])
+        start = end
+    return groups
+
+
+def _split_count(total, parts):
+    size, extra = divmod(total, parts)
+    return [size + (1 if part < extra else 0) for part in range(parts)]
@@ -1,22 +1,220 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
+from src.embedding_models import get_embedding_model, EMBEDDING_MODEL
+from src.index_factory import compact_index, save_index_settings, supports_removal, describe_index
+from src.index_store import save_index_files, open_index_files, check_writable, ReadOnlyIndexError
+from src.lexical_index import build_lexical_index, attach_lexical_index
+from src.token_chunker import TokenTextChunker, get_tokenizer, TOKEN_CHUNK_SIZE, TOKEN_CHUNK_OVERLAP
+from src.telemetry import stage, record_stage
+import hashlib
 import os
+import time
 
-def chunk_documents(documents, chunk_size=500, chunk_overlap=100):
-    splitter = RecursiveCharacterTextSplitter(
+# Chunks handed to the embedding engine per call, in engine batches (STUDYMATE_EMBED_BATCH_SIZE).
+# Several batches at once, so the engine's length sort can group chunks of similar length.
+EMBED_WINDOW_BATCHES = 8
+# Pages handed to the splitter at once (the token chunker tokenizes them in one batch)
+PAGES_PER_SPLIT = 16
+
+# "recursive": LangChain's character splitter, sizes in characters
+# "token": splits on embedding-model tokens, sizes in tokens
+CHUNKER = os.getenv("STUDYMATE_CHUNKER", "recursive")
+CHUNKER_DEFAULTS = {
+    "recursive": (500, 100),
+    "token": (TOKEN_CHUNK_SIZE, TOKEN_CHUNK_OVERLAP),
+}
+
+def chunk_settings(chunker=CHUNKER, chunk_size=None, chunk_overlap=None):
+    # Fills in the chunker's own defaults, sizes mean characters or tokens depending on the chunker
+    if chunker not in CHUNKER_DEFAULTS:
+        raise ValueError(f"Unknown chunker: {chunker}")
+    default_size, default_overlap = CHUNKER_DEFAULTS[chunker]
+    if chunk_size is None:
+        chunk_size = default_size
+    if chunk_overlap is None:
+        chunk_overlap = default_overlap
+    return chunker, chunk_size, chunk_overlap
+
+def get_splitter(chunker=CHUNKER, chunk_size=None, chunk_overlap=None, model_name=EMBEDDING_MODEL):
+    chunker, chunk_size, chunk_overlap = chunk_settings(chunker, chunk_size, chunk_overlap)
+    if chunker == "token":
+        return TokenTextChunker(get_tokenizer(model_name), chunk_size, chunk_overlap)
+    return RecursiveCharacterTextSplitter(
         chunk_size = chunk_size,
         chunk_overlap = chunk_overlap
     )
-    return splitter.split_documents(documents)
 
-def embed_and_store(chunks, persist_path="db"):
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    vector_db = FAISS.from_documents(chunks, embeddings)
+def chunk_documents(documents, chunk_size=None, chunk_overlap=None, chunker=CHUNKER):
+    splitter = get_splitter(chunker, chunk_size, chunk_overlap)
+    with stage("chunk", chunker=chunker) as fields:
+        chunks = splitter.split_documents(documents)
+        fields["chunks"] = len(chunks)
+    return chunks
+
+def iter_chunks(pages, chunk_size=None, chunk_overlap=None, chunker=CHUNKER):
+    # Same splitting as chunk_documents (both split each page separately), a few pages at a time
+    # Timed by splitting only, page loading and the consumer run in between
+    splitter = get_splitter(chunker, chunk_size, chunk_overlap)
+    seconds = 0.0
+    count = 0
+    for page_batch in iter_batches(pages, PAGES_PER_SPLIT):
+        start = time.perf_counter()
+        chunks = splitter.split_documents(page_batch)
+        seconds += time.perf_counter() - start
+        count += len(chunks)
+        yield from chunks
+    record_stage("chunk", seconds, {"chunker": chunker}, chunks=count)
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def get_embeddings(model_name=EMBEDDING_MODEL):
+    # Shared process-wide instance, weights are only loaded once
+    return get_embedding_model(model_name)
+
+def embed_window_size(embeddings):
+    return embeddings.batch_size * EMBED_WINDOW_BATCHES
+
+def chunk_ids(chunks, seen=None):
+    # Content hash of each chunk, used as its docstore id.
+    # Repeated text gets a counter suffix so every chunk keeps a unique id.
+    # Pass the same `seen` dict across batches of one document.
+    if seen is None:
+        seen = {}
+    ids = []
+    for chunk in chunks:
+        digest = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()[:32]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        ids.append(f"{digest}-{occurrence}")
+    return ids
+
+def embed_and_store(chunks, persist_path="db", model_name=EMBEDDING_MODEL,
+                    batch_size=None, progress_callback=None, index_type="auto"):
+    # `chunks` can be a list or a generator; it is embedded and added to the index batch by batch.
+    # batch_size: chunks per embedding call, defaults to embed_window_size()
+    # index_type: see index_factory.INDEX_TYPES, "auto" goes compact only for large documents
+    embeddings = get_embeddings(model_name)
+    batch_size = batch_size or embed_window_size(embeddings)
+    vector_db = None
+    seen = {}
+    done = 0
+    embed_seconds = 0.0
+
+    for batch in iter_batches(chunks, batch_size):
+        ids = chunk_ids(batch, seen)
+        start = time.perf_counter()
+        if vector_db is None:
+            vector_db = FAISS.from_documents(batch, embeddings, ids=ids)
+        else:
+            vector_db.add_documents(batch, ids=ids)
+        embed_seconds += time.perf_counter() - start
+        done += len(batch)
+        if progress_callback:
+            progress_callback(done)
+
+    if vector_db is None:
+        raise ValueError("No text could be extracted from the document.")
+    record_stage("embed", embed_seconds, {"model": model_name}, chunks=done)
+
+    # Retrain into an IVF/PQ/HNSW layout if the document is big enough to benefit
+    with stage("index_compact", index_type=index_type):
+        vector_db = compact_index(vector_db, index_type)
 
     # Save locally
-    if not os.path.exists(persist_path):
-        os.makedirs(persist_path)
-    vector_db.save_local(persist_path)
-    return vector_db
\ No newline at end of file
+    save_index(vector_db, persist_path)
+    return vector_db
+
+def update_index(vector_db, chunks, persist_path=None,
+                 batch_size=None, progress_callback=None):
+    # Incremental re-embed: only new/changed chunks are embedded, stale vectors are removed.
+    # A memory-mapped index is read-only, the update goes to a private in-memory copy of it instead.
+    # Raises ValueError for layouts that can't remove vectors (IVF, HNSW), as deleting would corrupt them.
+    if not supports_removal(vector_db.index):
+        index_class = describe_index(vector_db.index)["index_class"]
+        raise ValueError(f"Can't update a FAISS {index_class} in place: it can't remove vectors. Rebuild it with embed_and_store.")
+    try:
+        check_writable(vector_db)
+    except ReadOnlyIndexError as e:
+        vector_db = open_index_files(e.persist_path, vector_db.embeddings, mmap=False)
+    batch_size = batch_size or embed_window_size(vector_db.embeddings)
+    existing_ids = set(vector_db.index_to_docstore_id.values())
+    wanted_ids = set()
+    seen = {}
+    added = 0
+    kept = 0
+    embed_seconds = 0.0
+
+    for batch in iter_batches(chunks, batch_size):
+        ids = chunk_ids(batch, seen)
+        wanted_ids.update(ids)
+
+        new_chunks = []
+        new_ids = []
+        for doc_id, chunk in zip(ids, batch):
+            if doc_id in existing_ids:
+                # Same text, but page numbers etc. may have moved - no need to re-embed for that
+                vector_db.docstore._dict[doc_id] = chunk
+                kept += 1
+            else:
+                new_chunks.append(chunk)
+                new_ids.append(doc_id)
+        if new_chunks:
+            start = time.perf_counter()
+            vector_db.add_documents(new_chunks, ids=new_ids)
+            embed_seconds += time.perf_counter() - start
+            added += len(new_ids)
+        if progress_callback:
+            progress_callback(added + kept)
+
+    record_stage("embed", embed_seconds, {"model": getattr(vector_db.embeddings, "model_name", None)}, chunks=added)
+
+    stale_ids = [doc_id for doc_id in existing_ids if doc_id not in wanted_ids]
+    if stale_ids:
+        vector_db.delete(stale_ids)
+
+    if persist_path:
+        save_index(vector_db, persist_path)
+
+    stats = {
+        "added": added,
+        "removed": len(stale_ids),
+        "kept": kept,
+    }
+    return vector_db, stats
+
+def save_index(vector_db, persist_path):
+    # Saved in a format that can be opened memory-mapped (see index_store)
+    with stage("index_save") as fields:
+        save_index_files(vector_db, persist_path)
+        save_index_settings(vector_db, persist_path)
+        fields["vectors"] = vector_db.index.ntotal
+    # BM25 postings for hybrid search, by final FAISS position so they line up with the vectors
+    with stage("lexical_index") as fields:
+        lexical_index = build_lexical_index(vector_db)
+        lexical_index.save(persist_path)
+        attach_lexical_index(vector_db, lexical_index)
+        fields["terms"] = len(lexical_index.vocabulary)
+
+def get_all_chunks(vector_db):
+    # Every chunk stored in the index, in document order.
+    # Sorted by file and page because incremental updates append new chunks at the end.
+    chunks = []
+    for position in range(len(vector_db.index_to_docstore_id)):
+        doc_id = vector_db.index_to_docstore_id[position]
+        chunk = vector_db.docstore.search(doc_id)
+        if isinstance(chunk, Document):
+            chunks.append(chunk)
+    chunks.sort(key=lambda chunk: (
+        str(chunk.metadata.get("source_file", chunk.metadata.get("source", ""))),
+        chunk.metadata.get("page", 0)
+    ))
+    return chunks
@@ -0,0 +1,63 @@
+import functools
+import hashlib
+import multiprocessing
+import os
+import time
+
+# Small helpers shared by the caching, ingestion and generation modules.
+# Imported by app.py's startup modules, so nothing heavy at the top level here.
+
+
+def hash_file(file_path, hasher=None):
+    # sha256 (or the given hasher) updated with the file's bytes, read 1 MB at a time
+    hasher = hasher or hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher
+
+
+def touch(path):
+    # Marks a cache file as recently used: prune_files deletes the least recently modified files first
+    os.utime(path)
+
+
+def prune_files(directory, suffixes, max_files, max_age_seconds=None, keep=None):
+    # Deletes files ending in one of `suffixes`, oldest first, until at most max_files are left,
+    # plus any older than max_age_seconds. `keep` is never deleted and counts toward max_files.
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith(suffixes) and path != keep:
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+    entries.sort()
+
+    excess = max(len(entries) - (max_files - (keep is not None)), 0)
+    cutoff = time.time() - max_age_seconds if max_age_seconds is not None else None
+    removed = []
+    for position, (modified, path) in enumerate(entries):
+        if position < excess or (cutoff is not None and modified < cutoff):
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError:
+                pass
+    return removed
+
+
+def spawn_context():
+    # spawn, not fork: forking a process that already has torch threads running can deadlock
+    return multiprocessing.get_context("spawn")
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model="gpt-3.5-turbo"):
+    # tiktoken encoding for the model, cl100k_base for models tiktoken doesn't know
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
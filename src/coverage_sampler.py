@@ -0,0 +1,114 @@
+import threading
+import weakref
+import faiss
+import numpy as np
+from langchain.docstore.document import Document
+from src.chunk_and_embed import get_embeddings
+from src.common import get_encoding
+
+GENERATOR_MODEL = "gpt-3.5-turbo"
+
+# Source text per generated flashcard / question, capped so the prompt stays well inside the context
+TOKENS_PER_ITEM = 300
+MAX_SAMPLE_TOKENS = 6000
+KMEANS_ITERATIONS = 20
+# Fixed seed: the same index gives the same sample, so cached LLM answers keep matching
+KMEANS_SEED = 1234
+
+# vector_db -> {n_clusters: (assignments, distances)}, dropped together with the index
+_clusterings = weakref.WeakKeyDictionary()
+_clusterings_lock = threading.Lock()
+
+
+def sample_chunks(vector_db, num_items, token_budget=None):
+    # Chunks that cover the whole document instead of the top hits for one query:
+    # the index vectors are clustered into num_items topics and each topic contributes
+    # its most central chunks, round robin, until the token budget is used up.
+    # Returned in document order.
+    total = vector_db.index.ntotal
+    if total == 0:
+        return []
+    if token_budget is None:
+        token_budget = min(MAX_SAMPLE_TOKENS, TOKENS_PER_ITEM * num_items)
+
+    n_clusters = max(1, min(num_items, total))
+    assignments, distances = get_clustering(vector_db, n_clusters)
+
+    # Per cluster: positions closest to the centroid first. Bigger topics go first in each round.
+    members = [[] for _ in range(n_clusters)]
+    for position in np.lexsort((distances, assignments)):
+        members[assignments[position]].append(int(position))
+    members.sort(key=len, reverse=True)
+
+    encoding = get_encoding(GENERATOR_MODEL)
+    selected = []
+    used_tokens = 0
+    for round_index in range(max(len(cluster) for cluster in members)):
+        budget_left = True
+        for cluster in members:
+            if round_index >= len(cluster):
+                continue
+            doc = _chunk_at(vector_db, cluster[round_index])
+            if doc is None:
+                continue
+            tokens = len(encoding.encode_ordinary(doc.page_content))
+            if selected and used_tokens + tokens > token_budget:
+                budget_left = False
+                break
+            selected.append((cluster[round_index], doc))
+            used_tokens += tokens
+        if not budget_left:
+            break
+
+    selected.sort(key=lambda item: item[0])
+    return [doc for _, doc in selected]
+
+
+def get_clustering(vector_db, n_clusters):
+    # (cluster id, squared distance to its centroid) per index position, computed once per index
+    with _clusterings_lock:
+        cached = _clusterings.get(vector_db, {}).get(n_clusters)
+    if cached is not None:
+        return cached
+
+    vectors = _index_vectors(vector_db)
+    if n_clusters >= len(vectors):
+        # Every chunk is its own topic
+        clustering = (np.arange(len(vectors)), np.zeros(len(vectors), dtype="float32"))
+    else:
+        # faiss.Clustering rather than faiss.Kmeans: Kmeans converts the centroid std::vector to numpy,
+        # which breaks when PyMuPDF's SWIG module (also loaded here) owns that type. The trained
+        # index holds the centroids, so nothing needs converting.
+        kmeans = faiss.Clustering(vectors.shape[1], n_clusters)
+        kmeans.niter = KMEANS_ITERATIONS
+        kmeans.seed = KMEANS_SEED
+        kmeans.verbose = False
+        # Small documents have few chunks per topic, that's expected rather than worth a warning
+        kmeans.min_points_per_centroid = 1
+        centroid_index = faiss.IndexFlatL2(vectors.shape[1])
+        kmeans.train(vectors, centroid_index)
+        distances, assignments = centroid_index.search(vectors, 1)
+        clustering = (assignments[:, 0], distances[:, 0])
+
+    with _clusterings_lock:
+        _clusterings.setdefault(vector_db, {})[n_clusters] = clustering
+    return clustering
+
+
+def _index_vectors(vector_db):
+    # Read the stored vectors back (approximate for PQ / SQ layouts, close enough to cluster),
+    # re-embed only if the index type can't reconstruct
+    index = vector_db.index
+    try:
+        vectors = index.reconstruct_n(0, index.ntotal)
+    except RuntimeError:
+        docs = [_chunk_at(vector_db, position) for position in range(index.ntotal)]
+        texts = [doc.page_content if doc is not None else "" for doc in docs]
+        embeddings = getattr(vector_db, "embeddings", None) or get_embeddings()
+        vectors = embeddings.embed_documents(texts)
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def _chunk_at(vector_db, position):
+    doc = vector_db.docstore.search(vector_db.index_to_docstore_id[position])
+    return doc if isinstance(doc, Document) else None
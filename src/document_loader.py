@@ -1,12 +1,18 @@
-from langchain_community.document_loaders import PyPDFLoader, UnstructuredWordDocumentLoader
+from langchain.docstore.document import Document
+from src.text_extractors import extract_pages, get_extractor, count_pages
+
+def _page_document(file_path: str, page_number: int, text: str, paged: bool):
+    metadata = {"source": file_path}
+    if paged:
+        metadata["page"] = page_number
+    return Document(page_content=text, metadata=metadata)
 
 def load_document(file_path: str):
-    if file_path.endswith(".pdf"):
-        loader = PyPDFLoader(file_path)
-    elif file_path.endswith(".docx"):
-        loader = UnstructuredWordDocumentLoader(file_path)
-    else:
-        raise ValueError("Unsupported file format.")
-    
-    documents = loader.load()
-    return documents
\ No newline at end of file
+    return list(iter_document_pages(file_path))
+
+def iter_document_pages(file_path: str, max_workers=None):
+    # Yields one page at a time so the whole file never sits in memory as Documents.
+    # Uses the fastest installed extractor; large PDFs are extracted by several worker processes.
+    paged = get_extractor(file_path).paged
+    for page_number, text in extract_pages(file_path, max_workers=max_workers):
+        yield _page_document(file_path, page_number, text, paged)
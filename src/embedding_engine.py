@@ -0,0 +1,115 @@
+import functools
+import importlib.util
+import os
+import threading
+import time
+from langchain_core.embeddings import Embeddings
+
+EMBED_BATCH_SIZE = int(os.getenv("STUDYMATE_EMBED_BATCH_SIZE", "64"))
+# 0 keeps torch's default (all cores)
+EMBED_THREADS = int(os.getenv("STUDYMATE_EMBED_THREADS", "0"))
+# torch | onnx | onnx_int8
+EMBED_BACKEND = os.getenv("STUDYMATE_EMBED_BACKEND", "torch")
+EMBED_NORMALIZE = os.getenv("STUDYMATE_EMBED_NORMALIZE", "0") == "1"
+# None lets sentence-transformers pick cuda / mps / cpu
+EMBED_DEVICE = os.getenv("STUDYMATE_EMBED_DEVICE") or None
+
+# Dynamic int8 export shipped in the sentence-transformers MiniLM repos
+ONNX_INT8_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+
+# The ONNX backends are optional: pip install "sentence-transformers[onnx]"
+ONNX_PACKAGES = ("onnxruntime", "optimum")
+
+
+@functools.lru_cache(maxsize=1)
+def _torch():
+    # torch and sentence-transformers are imported when the first model loads, not when this module
+    # is imported, so importing the chunking / index code stays cheap
+    import torch
+    # Skip the TorchScript profiling executor, it only adds warm-up passes for inference
+    torch._C._jit_set_profiling_mode(False)
+    return torch
+
+
+class EmbeddingEngine(Embeddings):
+    # Drop-in for HuggingFaceEmbeddings with explicit batch size, thread count,
+    # normalization and an optional ONNX / int8 backend for CPU-only nodes.
+
+    def __init__(self, model_name, batch_size=EMBED_BATCH_SIZE, num_threads=EMBED_THREADS,
+                 backend=EMBED_BACKEND, normalize=EMBED_NORMALIZE, device=EMBED_DEVICE):
+        model_kwargs = {}
+        if backend == "onnx":
+            model_kwargs["backend"] = "onnx"
+        elif backend == "onnx_int8":
+            model_kwargs["backend"] = "onnx"
+            model_kwargs["model_kwargs"] = {"file_name": ONNX_INT8_FILE}
+        elif backend != "torch":
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        if backend != "torch":
+            missing = [name for name in ONNX_PACKAGES if importlib.util.find_spec(name) is None]
+            if missing:
+                raise ImportError(
+                    f"STUDYMATE_EMBED_BACKEND={backend} needs {', '.join(missing)}: "
+                    'pip install "sentence-transformers[onnx]", or use the torch backend.'
+                )
+
+        torch = _torch()
+        from sentence_transformers import SentenceTransformer
+        if num_threads:
+            # Process-wide intra-op pool, one engine per process so this is set once
+            torch.set_num_threads(num_threads)
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        self.normalize = normalize
+        self.client = SentenceTransformer(model_name, device=device, **model_kwargs)
+
+        self._stats_lock = threading.Lock()
+        self._texts_embedded = 0
+        self._seconds = 0.0
+
+    def embed_documents(self, texts):
+        # Newlines replaced like HuggingFaceEmbeddings does, so vectors match indexes built before.
+        # encode() sorts the call's texts by length before splitting them into batch_size batches, so
+        # callers pass several batches at once (see chunk_and_embed) to get batches of similar length.
+        texts = [text.replace("\n", " ") for text in texts]
+        start = time.perf_counter()
+        vectors = self.client.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            self._texts_embedded += len(texts)
+            self._seconds += elapsed
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def throughput_stats(self):
+        with self._stats_lock:
+            return {
+                "chunks_embedded": self._texts_embedded,
+                "embed_seconds": round(self._seconds, 3),
+                "chunks_per_sec": round(self._texts_embedded / self._seconds, 1) if self._seconds else 0.0,
+                "batch_size": self.batch_size,
+                "threads": _torch().get_num_threads(),
+                "backend": self.backend,
+                "device": str(self.client.device),
+            }
+
+
+def embedding_signature(model_name, backend=EMBED_BACKEND, normalize=EMBED_NORMALIZE):
+    # Part of the index cache key: settings that change the vectors must not share a cached index
+    signature = model_name
+    if backend != "torch":
+        signature += f"|{backend}"
+    if normalize:
+        signature += "|normalized"
+    return signature
@@ -0,0 +1,79 @@
+import threading
+import time
+from src.embedding_engine import EmbeddingEngine
+from src.telemetry import current_rss_bytes, log_event
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# One instance per model name for the whole process (shared by every Streamlit session)
+_models = {}
+_model_stats = {}
+_model_locks = {}
+_registry_lock = threading.Lock()
+
+
+def get_embedding_model(model_name=EMBEDDING_MODEL):
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    # Per-model lock so loading one model doesn't block lookups of another
+    with _registry_lock:
+        model_lock = _model_locks.setdefault(model_name, threading.Lock())
+
+    with model_lock:
+        if model_name not in _models:
+            _models[model_name] = _load_model(model_name)
+    return _models[model_name]
+
+
+def warm_up_embedding_models(model_names=(EMBEDDING_MODEL,), background=False):
+    def _warm_up():
+        for model_name in model_names:
+            model = get_embedding_model(model_name)
+            # First forward pass allocates buffers, do it before a user is waiting on it
+            model.embed_query("warm up")
+
+    if background:
+        thread = threading.Thread(target=_warm_up, name="embedding-warm-up", daemon=True)
+        thread.start()
+        return thread
+    _warm_up()
+    return None
+
+
+def embedding_model_stats():
+    # Load stats plus embedding throughput so far
+    stats = {}
+    for name, load_stats in _model_stats.items():
+        stats[name] = dict(load_stats)
+        model = _models.get(name)
+        if model is not None:
+            stats[name].update(model.throughput_stats())
+    return stats
+
+
+def _load_model(model_name):
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+
+    model = EmbeddingEngine(model_name)
+
+    load_seconds = time.perf_counter() - start
+    rss_after = current_rss_bytes()
+
+    _model_stats[model_name] = {
+        "load_seconds": round(load_seconds, 3),
+        "rss_delta_mb": round(max(rss_after - rss_before, 0) / (1024 * 1024), 1),
+        "param_mb": round(_param_bytes(model) / (1024 * 1024), 1),
+    }
+    log_event("embedding_model_loaded", model=model_name, **_model_stats[model_name])
+    return model
+
+
+def _param_bytes(model):
+    client = getattr(model, "client", None)
+    if client is None or not hasattr(client, "parameters"):
+        return 0
+    return sum(p.numel() * p.element_size() for p in client.parameters())
+
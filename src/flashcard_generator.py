@@ -1,17 +1,9 @@
 import os
-import json
 from langchain.prompts.chat import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain.prompts.chat import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-
-from langchain_openai import ChatOpenAI
+from src.llm_gateway import get_llm
+from src.batch_generation import generate_items
 
-def generate_flashcards(vector_db, num_cards=8):
-    # Get content from the vector database
-    retriever = vector_db.as_retriever(search_kwargs={"k": 5})
-    docs = retriever.get_relevant_documents("generate comprehensive flashcards")
-    
-    content = " ".join([doc.page_content for doc in docs])
-    
+def generate_flashcards(vector_db, num_cards=8, docs=None, use_cache=True):
     # Create a prompt template for flashcard generation
     system_template = """
     You are an assistant generating study material. Follow these formatting rules strictly:
@@ -37,23 +29,32 @@ def generate_flashcards(vector_db, num_cards=8):
     """
     
     # Set up the LLM chain
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0.5,
-    )
+    llm = get_llm("gpt-3.5-turbo", temperature=0.5)
 
     prompt = ChatPromptTemplate.from_messages([
         SystemMessagePromptTemplate.from_template(system_template),
         HumanMessagePromptTemplate.from_template(human_template)
     ])
-    
-    chain = prompt | llm
-    response = chain.invoke({"content": content, "num_cards": num_cards})
 
-    print("LLM RAW RESPONSE:\n", response)
-    
-    flashcards = []
-    raw_cards = response.content.strip()
-    flashcards = json.loads(raw_cards)
+    # Split over parallel calls (each on its own part of the notes, cached separately),
+    # parsed as the responses stream in, near-duplicate cards dropped.
+    # Content is a coverage sample of the document unless docs were passed in (e.g. for a study pack).
+    flashcards = generate_items(
+        vector_db,
+        prompt,
+        llm,
+        "num_cards",
+        num_cards,
+        docs=docs,
+        use_cache=use_cache,
+        is_valid=is_valid_flashcard,
+        dedupe_text=lambda card: card["front"]
+    )
+
+    return flashcards
+
 
-    return flashcards
\ No newline at end of file
+def is_valid_flashcard(card):
+    if not isinstance(card, dict):
+        return False
+    return all(isinstance(card.get(side), str) and card[side].strip() != "" for side in ("front", "back"))
@@ -0,0 +1,44 @@
+import numpy as np
+from langchain.docstore.document import Document
+from src.lexical_index import get_lexical_index
+
+# Candidates taken from each ranking before fusion
+HYBRID_FETCH_K = 20
+# Standard RRF constant: damps the difference between the very top ranks
+RRF_K = 60
+
+
+def hybrid_search(vector_db, query, query_vector, k=4, fetch_k=HYBRID_FETCH_K, rrf_k=RRF_K):
+    # Dense FAISS ranking + BM25 ranking, merged by reciprocal-rank fusion.
+    # Exact terms (formulas, names, course codes) surface even when the embedding misses them.
+    fetch_k = max(fetch_k, k)
+    rankings = [
+        dense_positions(vector_db, query_vector, fetch_k),
+        [position for position, _ in get_lexical_index(vector_db).search(query, fetch_k)],
+    ]
+    fused = reciprocal_rank_fusion(rankings, rrf_k)[:k]
+
+    docs = []
+    for position in fused:
+        doc = vector_db.docstore.search(vector_db.index_to_docstore_id[position])
+        if isinstance(doc, Document):
+            docs.append(doc)
+    return docs
+
+
+def dense_positions(vector_db, query_vector, k):
+    # FAISS positions only, documents are fetched once after fusion
+    vector = np.asarray([query_vector], dtype="float32")
+    if getattr(vector_db, "_normalize_L2", False):
+        vector /= np.maximum(np.linalg.norm(vector, axis=1, keepdims=True), 1e-12)
+    _, positions = vector_db.index.search(vector, k)
+    return [int(position) for position in positions[0] if position != -1]
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=RRF_K):
+    # Positions ordered by sum(1 / (rrf_k + rank)) over the rankings they appear in
+    scores = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking, start=1):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=lambda position: (-scores[position], position))
@@ -0,0 +1,244 @@
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from src.chunk_and_embed import iter_chunks, embed_and_store, update_index, save_index, chunk_settings, EMBEDDING_MODEL, CHUNKER
+from src.document_loader import iter_document_pages, count_pages
+from src.multi_file_ingest import ingest_files
+from src.index_manager import register_index, get_index, is_hot, in_use_index_keys, forget_index, load_index
+from src.index_factory import supports_removal
+from src.embedding_engine import embedding_signature
+from src.common import hash_file
+from src.telemetry import record_cache
+
+CACHE_DIR = "db"
+MAX_CACHED_INDEXES = 20
+MAX_CACHE_BYTES = 1024 * 1024 * 1024  # 1 GB
+
+# File touched on every hit so the least recently used index can be evicted first
+LAST_USED_FILE = ".last_used"
+
+# Maps a document name to the cache key of its most recently indexed version
+LATEST_DIR = ".latest"
+
+
+def index_cache_key(file_path, chunk_size=None, chunk_overlap=None, model_name=EMBEDDING_MODEL, chunker=CHUNKER):
+    # Same bytes + same chunking + same model -> same index
+    hasher = hash_file(file_path)
+    hasher.update(f"|{_settings_label(chunker, chunk_size, chunk_overlap, model_name)}".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def get_or_build_index(file_path, chunk_size=None, chunk_overlap=None, model_name=EMBEDDING_MODEL,
+                       cache_dir=CACHE_DIR, document_name=None, progress_callback=None, chunker=CHUNKER):
+    # Returns (index_key, vector_db, cache_hit). Sessions should keep index_key and fetch the
+    # index with index_manager.get_index, which may spill it from memory and reload it later.
+    # progress_callback(pages_done, total_pages) as each page is read, ahead of its chunks being embedded;
+    # total_pages is None when it can't be counted cheaply
+    chunker, chunk_size, chunk_overlap = chunk_settings(chunker, chunk_size, chunk_overlap)
+    settings = _settings_label(chunker, chunk_size, chunk_overlap, model_name)
+    key = index_cache_key(file_path, chunk_size, chunk_overlap, model_name, chunker)
+    index_path = os.path.join(cache_dir, key)
+
+    # Cache hit: reuse the in-memory or saved index instead of re-embedding
+    if is_hot(key) or _index_exists(index_path):
+        vector_db = _open_index(key, index_path, model_name)
+        _touch(index_path)
+        record_cache("index", True)
+        if document_name:
+            _set_latest_key(cache_dir, document_name, settings, key)
+        return key, vector_db, True
+
+    record_cache("index", False)
+    # Pages are loaded, chunked and embedded lazily so memory stays bounded for big files
+    pages = _track_pages(iter_document_pages(file_path), count_pages(file_path), progress_callback)
+    chunks = iter_chunks(pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunker=chunker)
+    # Write into a temp dir and rename, so a half-written index is never picked up
+    tmp_path = os.path.join(cache_dir, f".tmp-{key}-{uuid.uuid4().hex}")
+
+    # Cache miss on an edited version of a known document: start from its previous index
+    previous_path = None
+    if document_name:
+        previous_key = _get_latest_key(cache_dir, document_name, settings)
+        if previous_key:
+            previous_path = os.path.join(cache_dir, previous_key)
+
+    previous_db = None
+    if previous_path and _index_exists(previous_path):
+        # Fresh copy from disk: the previous version may be shared in memory by other sessions
+        previous_db = load_index(previous_path, model_name, mmap=False)
+        if not supports_removal(previous_db.index):
+            previous_db = None
+
+    try:
+        if previous_db is not None:
+            vector_db, _ = update_index(previous_db, chunks)
+            save_index(vector_db, tmp_path)
+        else:
+            vector_db = embed_and_store(chunks, persist_path=tmp_path, model_name=model_name)
+    except BaseException:
+        # Failed or cancelled half way, don't leave a partial index behind
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    try:
+        os.replace(tmp_path, index_path)
+    except OSError:
+        # Another session finished the same document first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    _touch(index_path)
+    if document_name:
+        _set_latest_key(cache_dir, document_name, settings, key)
+
+    register_index(key, vector_db, index_path, model_name)
+    prune_index_cache(cache_dir, keep=key)
+    return key, vector_db, False
+
+
+def get_or_build_multi_index(file_paths, chunk_size=None, chunk_overlap=None, model_name=EMBEDDING_MODEL,
+                             cache_dir=CACHE_DIR, max_workers=None, progress_callback=None, chunker=CHUNKER):
+    # One merged index for a set of files, returns (index_key, vector_db, cache_hit).
+    # progress_callback(files_done, total_files)
+    chunker, chunk_size, chunk_overlap = chunk_settings(chunker, chunk_size, chunk_overlap)
+    file_keys = sorted(index_cache_key(path, chunk_size, chunk_overlap, model_name, chunker) for path in file_paths)
+    key = hashlib.sha256("|".join(file_keys).encode("utf-8")).hexdigest()
+    index_path = os.path.join(cache_dir, key)
+
+    if is_hot(key) or _index_exists(index_path):
+        vector_db = _open_index(key, index_path, model_name)
+        _touch(index_path)
+        record_cache("index", True)
+        return key, vector_db, True
+
+    record_cache("index", False)
+    tmp_path = os.path.join(cache_dir, f".tmp-{key}-{uuid.uuid4().hex}")
+    try:
+        vector_db = ingest_files(
+            file_paths,
+            persist_path=tmp_path,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            chunker=chunker,
+            model_name=model_name,
+            max_workers=max_workers,
+            progress_callback=progress_callback
+        )
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    try:
+        os.replace(tmp_path, index_path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    _touch(index_path)
+
+    register_index(key, vector_db, index_path, model_name)
+    prune_index_cache(cache_dir, keep=key)
+    return key, vector_db, False
+
+
+def prune_index_cache(cache_dir=CACHE_DIR, max_entries=MAX_CACHED_INDEXES,
+                      max_bytes=MAX_CACHE_BYTES, keep=None):
+    if not os.path.isdir(cache_dir):
+        return []
+
+    # Indexes held in memory or recently used by a session (even if spilled to disk) are never removed
+    in_use = in_use_index_keys()
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        entries.append((_last_used(path), _dir_size(path), name, path))
+
+    # Oldest first
+    entries.sort()
+    total_bytes = sum(size for _, size, _, _ in entries)
+
+    removed = []
+    for last_used, size, name, path in entries:
+        if len(entries) - len(removed) <= max_entries and total_bytes <= max_bytes:
+            break
+        if name == keep or name in in_use:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        forget_index(name)
+        total_bytes -= size
+        removed.append(name)
+    return removed
+
+
+def _track_pages(pages, total_pages, progress_callback):
+    for pages_done, page in enumerate(pages, start=1):
+        yield page
+        if progress_callback:
+            progress_callback(pages_done, total_pages)
+
+
+def _index_exists(index_path):
+    return os.path.exists(os.path.join(index_path, "index.faiss"))
+
+
+def _open_index(key, index_path, model_name):
+    # Shared in-memory copy when another session already has it loaded
+    if is_hot(key):
+        return get_index(key)
+    vector_db = load_index(index_path, model_name)
+    register_index(key, vector_db, index_path, model_name)
+    return vector_db
+
+
+def _settings_label(chunker, chunk_size, chunk_overlap, model_name):
+    chunker, chunk_size, chunk_overlap = chunk_settings(chunker, chunk_size, chunk_overlap)
+    return f"{chunker}|{chunk_size}|{chunk_overlap}|{embedding_signature(model_name)}"
+
+
+def _latest_pointer_path(cache_dir, document_name, settings):
+    name_key = hashlib.sha256(f"{document_name}|{settings}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, LATEST_DIR, name_key)
+
+
+def _get_latest_key(cache_dir, document_name, settings):
+    pointer = _latest_pointer_path(cache_dir, document_name, settings)
+    try:
+        with open(pointer) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _set_latest_key(cache_dir, document_name, settings, key):
+    pointer = _latest_pointer_path(cache_dir, document_name, settings)
+    os.makedirs(os.path.dirname(pointer), exist_ok=True)
+    with open(pointer, "w") as f:
+        f.write(key)
+
+
+def _touch(index_path):
+    marker = os.path.join(index_path, LAST_USED_FILE)
+    try:
+        with open(marker, "w") as f:
+            f.write(str(time.time()))
+    except OSError:
+        pass
+
+
+def _last_used(index_path):
+    marker = os.path.join(index_path, LAST_USED_FILE)
+    if os.path.exists(marker):
+        return os.path.getmtime(marker)
+    return os.path.getmtime(index_path)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file_name))
+            except OSError:
+                pass
+    return total
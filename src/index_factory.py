@@ -0,0 +1,202 @@
+import json
+import math
+import os
+import time
+import faiss
+import numpy as np
+
+INDEX_SETTINGS_FILE = "index_settings.json"
+
+# "auto" picks by chunk count; the others force a layout
+INDEX_TYPES = ("auto", "flat", "sq8", "ivf_flat", "ivf_sq8", "ivf_pq", "hnsw", "hnsw_sq8")
+
+# Below this a flat index is both the fastest to build and fast enough to search
+AUTO_FLAT_MAX = 20000
+# Below this IVF + 8-bit scalar quantization (4x smaller), above it IVF-PQ (~32x smaller)
+AUTO_SQ8_MAX = 200000
+# FAISS wants roughly this many training points per IVF list
+TRAIN_POINTS_PER_LIST = 39
+HNSW_NEIGHBORS = 32
+
+
+def choose_index_spec(n_vectors, dim, index_type="auto"):
+    # Returns (faiss factory string, nprobe or None)
+    if index_type == "auto":
+        if n_vectors < AUTO_FLAT_MAX:
+            index_type = "flat"
+        elif n_vectors < AUTO_SQ8_MAX:
+            index_type = "ivf_sq8"
+        else:
+            index_type = "ivf_pq"
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}")
+
+    if index_type == "flat":
+        return "Flat", None
+    if index_type == "sq8":
+        return "SQ8", None
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_NEIGHBORS}", None
+    if index_type == "hnsw_sq8":
+        return f"HNSW{HNSW_NEIGHBORS},SQ8", None
+
+    # IVF: ~4*sqrt(n) lists, but never more than the vectors can train
+    nlist = int(4 * math.sqrt(n_vectors))
+    nlist = max(1, min(nlist, n_vectors // TRAIN_POINTS_PER_LIST))
+    nprobe = max(1, min(nlist, nlist // 16 or 1))
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat", nprobe
+    if index_type == "ivf_sq8":
+        return f"IVF{nlist},SQ8", nprobe
+    # PQ with 8 dims per sub-quantizer (384-d MiniLM -> 48 bytes per vector)
+    return f"IVF{nlist},PQ{_pq_subquantizers(dim)}", nprobe
+
+
+def build_index(vectors, spec, nprobe=None, metric=faiss.METRIC_L2):
+    # Trains the index on the document's own vectors, then adds them in the same order
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    index = faiss.index_factory(vectors.shape[1], spec, metric)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    _configure(index, nprobe)
+    return index
+
+
+def compact_index(vector_db, index_type="auto"):
+    # Swaps the flat index built during embedding for the chosen layout.
+    # Position i still holds vector i, so index_to_docstore_id stays valid.
+    flat = vector_db.index
+    spec, nprobe = choose_index_spec(flat.ntotal, flat.d, index_type)
+    if spec == "Flat" or flat.ntotal == 0:
+        return vector_db
+
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    vector_db.index = build_index(vectors, spec, nprobe, flat.metric_type)
+    return vector_db
+
+
+def supports_removal(index):
+    # LangChain's FAISS.delete assumes removal shifts later vectors down one position.
+    # Only the flat-code layouts (Flat, SQ8) do that; IVF leaves gaps and HNSW can't remove at all,
+    # so edited documents with those layouts are re-embedded instead of updated in place.
+    flat_codes = getattr(faiss, "IndexFlatCodes", faiss.IndexFlat)
+    return isinstance(faiss.downcast_index(index), flat_codes)
+
+
+def describe_index(index):
+    index = faiss.downcast_index(index)
+    settings = {
+        "index_class": type(index).__name__,
+        "ntotal": int(index.ntotal),
+        "dim": int(index.d),
+        "code_size": int(getattr(index, "code_size", 0) or index.d * 4),
+    }
+    ivf = _extract_ivf(index)
+    if ivf is not None:
+        settings["nlist"] = int(ivf.nlist)
+        settings["nprobe"] = int(ivf.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        settings["ef_search"] = int(index.hnsw.efSearch)
+    return settings
+
+
+def save_index_settings(vector_db, persist_path):
+    with open(os.path.join(persist_path, INDEX_SETTINGS_FILE), "w") as f:
+        json.dump(describe_index(vector_db.index), f, indent=2)
+
+
+def apply_index_settings(vector_db, persist_path):
+    # Search-time parameters such as nprobe are not stored by faiss.write_index
+    settings_path = os.path.join(persist_path, INDEX_SETTINGS_FILE)
+    if not os.path.exists(settings_path):
+        return vector_db
+    with open(settings_path) as f:
+        settings = json.load(f)
+    ivf = _extract_ivf(vector_db.index)
+    if ivf is not None and "nprobe" in settings:
+        ivf.nprobe = settings["nprobe"]
+    return vector_db
+
+
+def recall_latency_report(vectors, index_types=("ivf_flat", "ivf_sq8", "ivf_pq", "hnsw", "hnsw_sq8"),
+                          k=10, num_queries=200, seed=0):
+    # Recall@k and per-query latency of each layout against an exact flat search,
+    # using a sample of the document's own vectors as queries
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    rng = np.random.default_rng(seed)
+    query_ids = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    queries = vectors[query_ids]
+    k = min(k, len(vectors))
+
+    flat = build_index(vectors, "Flat")
+    start = time.perf_counter()
+    _, truth = flat.search(queries, k)
+    flat_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    report = [{
+        "index_type": "flat",
+        "spec": "Flat",
+        "recall_at_k": 1.0,
+        "query_ms": round(flat_ms, 4),
+        "bytes_per_vector": vectors.shape[1] * 4,
+        "build_seconds": 0.0,
+    }]
+    for index_type in index_types:
+        spec, nprobe = choose_index_spec(len(vectors), vectors.shape[1], index_type)
+        start = time.perf_counter()
+        try:
+            index = build_index(vectors, spec, nprobe)
+        except RuntimeError as e:
+            # e.g. too few vectors to train PQ codebooks
+            report.append({"index_type": index_type, "spec": spec, "error": str(e)})
+            continue
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        hits = sum(len(set(found[row]) & set(truth[row])) for row in range(len(queries)))
+        report.append({
+            "index_type": index_type,
+            "spec": spec,
+            "recall_at_k": round(hits / (len(queries) * k), 4),
+            "query_ms": round(query_ms, 4),
+            "bytes_per_vector": describe_index(index)["code_size"],
+            "build_seconds": round(build_seconds, 3),
+        })
+    return report
+
+
+def _configure(index, nprobe):
+    ivf = _extract_ivf(index)
+    if ivf is not None:
+        if nprobe:
+            ivf.nprobe = nprobe
+        # Lets FAISS reconstruct vectors by position (needed for MMR and reading vectors back)
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+
+def _extract_ivf(index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def _pq_subquantizers(dim):
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+if __name__ == "__main__":
+    # python -m src.index_factory db/<index key>
+    import sys
+    index = faiss.read_index(os.path.join(sys.argv[1], "index.faiss"))
+    sample = index.reconstruct_n(0, index.ntotal)
+    for row in recall_latency_report(sample):
+        print(json.dumps(row))
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from src.chunk_and_embed import get_embeddings, EMBEDDING_MODEL
+from src.index_factory import apply_index_settings
+from src.index_store import open_index_files
+from src.lexical_index import LexicalIndex, attach_lexical_index
+
+# Global RAM budget for every FAISS index held in memory, across all sessions
+MEMORY_BUDGET_BYTES = int(os.getenv("STUDYMATE_INDEX_RAM_MB", "1024")) * 1024 * 1024
+
+# key -> vector_db, least recently used first
+_hot_indexes = OrderedDict()
+_index_sizes = {}
+# A session that used its index within this window still needs it: its files are kept on disk
+INDEX_IN_USE_SECONDS = int(os.getenv("STUDYMATE_INDEX_IN_USE_MINUTES", "120")) * 60
+
+# key -> (index_path, model_name), kept after eviction so the index can be reloaded
+_index_locations = {}
+# key -> time of the last register_index / get_index
+_last_access = {}
+_manager_lock = threading.RLock()
+_load_locks = {}
+
+
+def register_index(key, vector_db, index_path, model_name=EMBEDDING_MODEL):
+    # Sessions keep only `key`; the index itself lives here and on disk at index_path
+    with _manager_lock:
+        _index_locations[key] = (index_path, model_name)
+        _last_access[key] = time.time()
+        _put(key, vector_db)
+    return key
+
+
+def get_index(key):
+    with _manager_lock:
+        if key in _index_locations:
+            _last_access[key] = time.time()
+        vector_db = _hot_indexes.get(key)
+        if vector_db is not None:
+            _hot_indexes.move_to_end(key)
+            return vector_db
+        if key not in _index_locations:
+            raise KeyError(f"Unknown index: {key}")
+        index_path, model_name = _index_locations[key]
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    # Cold: reload from disk, one loader per key so concurrent sessions don't load it twice
+    with load_lock:
+        with _manager_lock:
+            vector_db = _hot_indexes.get(key)
+        if vector_db is None:
+            if not os.path.exists(os.path.join(index_path, "index.faiss")):
+                raise KeyError(f"Index {key} is no longer on disk, please process the document again.")
+            vector_db = load_index(index_path, model_name)
+            with _manager_lock:
+                _put(key, vector_db)
+    return vector_db
+
+
+def is_hot(key):
+    with _manager_lock:
+        return key in _hot_indexes
+
+
+def in_use_index_keys():
+    # Indexes in memory plus those a session used recently (possibly spilled to disk).
+    # Locations idle for longer are forgotten here, which keeps the location table bounded.
+    with _manager_lock:
+        cutoff = time.time() - INDEX_IN_USE_SECONDS
+        for key in [key for key, last in _last_access.items() if last < cutoff and key not in _hot_indexes]:
+            _forget(key)
+        return set(_hot_indexes) | set(_index_locations)
+
+
+def forget_index(key):
+    # The index files were deleted: drop everything known about it
+    with _manager_lock:
+        _hot_indexes.pop(key, None)
+        _index_sizes.pop(key, None)
+        _forget(key)
+
+
+def evict_index(key):
+    # Drop from memory only, the files on disk stay
+    with _manager_lock:
+        _hot_indexes.pop(key, None)
+        _index_sizes.pop(key, None)
+
+
+def memory_usage():
+    with _manager_lock:
+        return {
+            "hot_indexes": len(_hot_indexes),
+            "bytes": sum(_index_sizes.values()),
+            "budget_bytes": MEMORY_BUDGET_BYTES,
+        }
+
+
+def load_index(index_path, model_name=EMBEDDING_MODEL, mmap=True):
+    # Memory-mapped by default: opening is near-instant and replicas on one host share the page cache.
+    # Use mmap=False for a private, modifiable copy.
+    vector_db = open_index_files(index_path, get_embeddings(model_name), mmap=mmap)
+    lexical_index = LexicalIndex.load(index_path, mmap=mmap)
+    if lexical_index is not None:
+        attach_lexical_index(vector_db, lexical_index)
+    return apply_index_settings(vector_db, index_path)
+
+
+def estimate_index_bytes(vector_db):
+    index = vector_db.index
+    code_size = getattr(index, "code_size", 0) or index.d * 4
+    vector_bytes = index.ntotal * code_size
+    # Docstore: the chunk text plus a rough per-Document overhead for metadata and the object itself
+    # (nothing for memory-mapped SQLite docstores, their text stays on disk)
+    docs = getattr(vector_db.docstore, "_dict", {})
+    text_bytes = sum(len(doc.page_content) + 300 for doc in docs.values())
+    return vector_bytes + text_bytes
+
+
+def _forget(key):
+    # Caller holds _manager_lock
+    _index_locations.pop(key, None)
+    _last_access.pop(key, None)
+    _load_locks.pop(key, None)
+
+
+def _put(key, vector_db):
+    # Caller holds _manager_lock
+    _hot_indexes[key] = vector_db
+    _hot_indexes.move_to_end(key)
+    _index_sizes[key] = estimate_index_bytes(vector_db)
+
+    # Spill the coldest indexes until we're back under budget (never the one just added)
+    while sum(_index_sizes.values()) > MEMORY_BUDGET_BYTES and len(_hot_indexes) > 1:
+        cold_key, _ = _hot_indexes.popitem(last=False)
+        _index_sizes.pop(cold_key, None)
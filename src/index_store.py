@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import threading
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain.docstore.document import Document
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite3"
+
+
+class ReadOnlyIndexError(PermissionError):
+    # Modifying an index opened memory-mapped; reopen it with mmap=False to get a writable copy
+    def __init__(self, persist_path):
+        super().__init__(f"Index at {persist_path} is opened memory-mapped (read-only), load it with mmap=False to modify it.")
+        self.persist_path = persist_path
+
+
+class SqliteDocstore(Docstore):
+    # Read-only docstore that looks chunks up in SQLite on demand instead of unpickling them all.
+    # The file is memory-mapped, so processes opening the same index share the OS page cache.
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._connection.execute("PRAGMA mmap_size = 268435456")
+        self._lock = threading.Lock()
+
+    def search(self, search):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, metadata FROM chunks WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            # Same contract as InMemoryDocstore
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts):
+        raise ReadOnlyIndexError(os.path.dirname(self.path))
+
+    def delete(self, ids):
+        raise ReadOnlyIndexError(os.path.dirname(self.path))
+
+
+def check_writable(vector_db):
+    # Raises ReadOnlyIndexError for an index opened memory-mapped, before anything is changed
+    if isinstance(vector_db.docstore, SqliteDocstore):
+        raise ReadOnlyIndexError(os.path.dirname(vector_db.docstore.path))
+
+
+def save_index_files(vector_db, persist_path):
+    # index.faiss (raw FAISS) + docstore.sqlite3 (one row per chunk, in index order) instead of a pickle
+    if not os.path.exists(persist_path):
+        os.makedirs(persist_path)
+
+    faiss.write_index(vector_db.index, os.path.join(persist_path, INDEX_FILE))
+
+    docstore_path = os.path.join(persist_path, DOCSTORE_FILE)
+    tmp_path = docstore_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute(
+            "CREATE TABLE chunks (position INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+            "content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        rows = []
+        for position in sorted(vector_db.index_to_docstore_id):
+            doc_id = vector_db.index_to_docstore_id[position]
+            doc = vector_db.docstore.search(doc_id)
+            rows.append((position, doc_id, doc.page_content, json.dumps(doc.metadata, default=str)))
+        connection.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, docstore_path)
+
+    # Drop a pickle left over from the old format so it can't go stale
+    legacy_path = os.path.join(persist_path, "index.pkl")
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+
+def open_index_files(persist_path, embeddings, mmap=True):
+    # mmap=True: FAISS data and the docstore stay on disk and are paged in on use (read-only).
+    # mmap=False: everything is read into memory and can be modified (e.g. incremental updates).
+    docstore_path = os.path.join(persist_path, DOCSTORE_FILE)
+    if not os.path.exists(docstore_path):
+        # Saved before the docstore moved to SQLite
+        return FAISS.load_local(
+            persist_path,
+            embeddings,
+            allow_dangerous_deserialization=True  # we wrote these files ourselves
+        )
+
+    index = _read_faiss_index(os.path.join(persist_path, INDEX_FILE), mmap)
+
+    connection = sqlite3.connect(f"file:{docstore_path}?mode=ro", uri=True)
+    try:
+        if mmap:
+            rows = connection.execute("SELECT position, id FROM chunks ORDER BY position").fetchall()
+            index_to_docstore_id = {position: doc_id for position, doc_id in rows}
+            docstore = SqliteDocstore(docstore_path)
+        else:
+            rows = connection.execute(
+                "SELECT position, id, content, metadata FROM chunks ORDER BY position"
+            ).fetchall()
+            index_to_docstore_id = {position: doc_id for position, doc_id, _, _ in rows}
+            docstore = InMemoryDocstore({
+                doc_id: Document(page_content=content, metadata=json.loads(metadata))
+                for _, doc_id, content, metadata in rows
+            })
+    finally:
+        connection.close()
+
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def _read_faiss_index(index_path, mmap):
+    if not mmap:
+        return faiss.read_index(index_path)
+
+    # IO_FLAG_MMAP maps IVF lists; IO_FLAG_MMAP_IFC (newer FAISS) also maps flat/SQ codes
+    flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+    try:
+        return faiss.read_index(index_path, flags)
+    except RuntimeError:
+        # Index type without mmap support in this FAISS build
+        return faiss.read_index(index_path)
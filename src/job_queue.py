@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.common import prune_files
+
+# Threads, not processes: jobs share the loaded embedding model and in-memory indexes,
+# and the heavy parts (torch, FAISS, HTTP calls to the LLM) release the GIL
+MAX_WORKERS = int(os.getenv("STUDYMATE_JOB_WORKERS", "4"))
+JOBS_DIR = "jobs"
+# Finished jobs are dropped from memory after this, their results stay on disk
+JOB_RETENTION_SECONDS = 6 * 60 * 60
+# Result files on disk: kept for a week, at most this many (oldest deleted first)
+JOB_FILE_RETENTION_SECONDS = 7 * 24 * 60 * 60
+MAX_JOB_FILES = 500
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    # Handed to the job function as its first argument, for progress reports and cancellation
+
+    def __init__(self, job_id, kind, dedupe_key=None):
+        self.id = job_id
+        self.kind = kind
+        self.dedupe_key = dedupe_key
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = ""
+        self.partial = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    def report(self, progress=None, message=None, partial=None):
+        # Also the cancellation point: a cancelled job stops at its next report
+        self.check_cancelled()
+        if progress is not None:
+            self.progress = max(0.0, min(float(progress), 1.0))
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "partial": self.partial,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_executor = None
+_jobs = {}
+_active_by_key = {}
+_jobs_lock = threading.Lock()
+
+
+def submit_job(kind, func, *args, dedupe_key=None, **kwargs):
+    # Runs func(job, *args, **kwargs) on the worker pool and returns the job id right away.
+    # Submitting the same dedupe_key while that job is still queued/running returns the same id.
+    with _jobs_lock:
+        _prune_finished_jobs()
+
+        if dedupe_key is not None:
+            existing_id = _active_by_key.get(dedupe_key)
+            if existing_id and _jobs[existing_id].status in ACTIVE_STATUSES:
+                return existing_id
+
+        job = Job(uuid.uuid4().hex, kind, dedupe_key)
+        _jobs[job.id] = job
+        if dedupe_key is not None:
+            _active_by_key[dedupe_key] = job.id
+        job.future = _get_executor().submit(_run_job, job, func, args, kwargs)
+    return job.id
+
+
+def get_job(job_id):
+    # Snapshot dict of the job, None if it is unknown (e.g. the server restarted before it finished)
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return job.snapshot()
+    return _load_persisted_job(job_id)
+
+
+def cancel_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None or job.status not in ACTIVE_STATUSES:
+        return False
+
+    job._cancel_event.set()
+    if job.future is not None and job.future.cancel():
+        # Never started
+        _finish(job, "cancelled")
+    return True
+
+
+def _run_job(job, func, args, kwargs):
+    if job._cancel_event.is_set():
+        _finish(job, "cancelled")
+        return
+
+    job.status = "running"
+    try:
+        job.result = func(job, *args, **kwargs)
+        job.progress = 1.0
+        _finish(job, "done")
+    except JobCancelled:
+        _finish(job, "cancelled")
+    except Exception as e:
+        job.error = str(e)
+        _finish(job, "failed")
+
+
+def _finish(job, status):
+    job.status = status
+    job.finished_at = time.time()
+    with _jobs_lock:
+        if _active_by_key.get(job.dedupe_key) == job.id:
+            del _active_by_key[job.dedupe_key]
+    if status == "done":
+        _persist_job(job)
+
+
+def _persist_job(job):
+    # Results outlive the in-memory job table (and a browser refresh or disconnect)
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = os.path.join(JOBS_DIR, f"{job.id}.json")
+    tmp_path = path + ".tmp"
+    snapshot = job.snapshot()
+    snapshot["partial"] = None
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f, default=str)
+    os.replace(tmp_path, path)
+    _prune_job_files()
+
+
+def _load_persisted_job(job_id):
+    path = os.path.join(JOBS_DIR, f"{os.path.basename(job_id)}.json")
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _prune_finished_jobs():
+    # Caller holds _jobs_lock
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    for job_id in [job_id for job_id, job in _jobs.items() if job.finished_at and job.finished_at < cutoff]:
+        del _jobs[job_id]
+
+
+def _prune_job_files(max_files=MAX_JOB_FILES, retention_seconds=JOB_FILE_RETENTION_SECONDS):
+    prune_files(JOBS_DIR, (".json",), max_files, max_age_seconds=retention_seconds)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="studymate-job")
+    return _executor
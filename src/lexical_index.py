@@ -0,0 +1,138 @@
+import json
+import math
+import os
+import re
+import threading
+import weakref
+from collections import Counter
+import numpy as np
+from langchain.docstore.document import Document
+
+LEXICAL_DIR = "lexical"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Plain words plus joined forms like "cs-101", "e=mc2" or "3.14", so codes and formulas match exactly
+_WORD_PATTERN = re.compile(r"\w+")
+_COMPOUND_PATTERN = re.compile(r"\w+(?:[-.+=^/]\w+)+")
+
+# vector_db -> LexicalIndex, dropped together with the index
+_lexical_indexes = weakref.WeakKeyDictionary()
+_lexical_lock = threading.Lock()
+
+
+def tokenize(text):
+    text = text.lower()
+    return _WORD_PATTERN.findall(text) + _COMPOUND_PATTERN.findall(text)
+
+
+class LexicalIndex:
+    # BM25 over the chunks of one FAISS index, as a term -> postings sparse matrix (CSR by term).
+    # Postings hold FAISS positions and precomputed BM25 weights (idf and length normalisation
+    # already applied), so scoring a query is a sum over the postings of its terms.
+
+    def __init__(self, vocabulary, indptr, positions, weights, size):
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.positions = positions
+        self.weights = weights
+        self.size = size
+
+    @classmethod
+    def build(cls, texts):
+        # texts[i] is the chunk at FAISS position i
+        term_counts = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype="float32")
+        average_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+
+        postings = {}
+        for position, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((position, count))
+
+        vocabulary = {}
+        indptr = [0]
+        positions = []
+        weights = []
+        total = len(texts)
+        for term_id, term in enumerate(sorted(postings)):
+            vocabulary[term] = term_id
+            term_postings = postings[term]
+            idf = math.log(1 + (total - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+            for position, count in term_postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[position] / average_length)
+                positions.append(position)
+                weights.append(idf * count * (BM25_K1 + 1) / (count + norm))
+            indptr.append(len(positions))
+
+        return cls(
+            vocabulary,
+            np.array(indptr, dtype="int64"),
+            np.array(positions, dtype="int32"),
+            np.array(weights, dtype="float32"),
+            total
+        )
+
+    def search(self, query, k):
+        # [(position, score)] best first, only chunks sharing at least one term with the query
+        term_ids = {self.vocabulary[term] for term in tokenize(query) if term in self.vocabulary}
+        if not term_ids:
+            return []
+        scores = np.zeros(self.size, dtype="float32")
+        for term_id in term_ids:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            # A term appears at most once per chunk in its postings, so plain fancy-index add is safe
+            scores[self.positions[start:end]] += self.weights[start:end]
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(position), float(scores[position])) for position in matched]
+
+    def save(self, persist_path):
+        directory = os.path.join(persist_path, LEXICAL_DIR)
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "indptr.npy"), self.indptr)
+        np.save(os.path.join(directory, "positions.npy"), self.positions)
+        np.save(os.path.join(directory, "weights.npy"), self.weights)
+        with open(os.path.join(directory, "vocabulary.json"), "w") as f:
+            json.dump({"size": self.size, "terms": self.vocabulary}, f)
+
+    @classmethod
+    def load(cls, persist_path, mmap=True):
+        # None when the index was saved before lexical indexes existed
+        directory = os.path.join(persist_path, LEXICAL_DIR)
+        try:
+            with open(os.path.join(directory, "vocabulary.json")) as f:
+                meta = json.load(f)
+            mmap_mode = "r" if mmap else None
+            arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                      for name in ("indptr", "positions", "weights")]
+        except (OSError, ValueError):
+            return None
+        return cls(meta["terms"], *arrays, meta["size"])
+
+
+def build_lexical_index(vector_db):
+    # From the chunks in FAISS position order
+    texts = []
+    for position in range(vector_db.index.ntotal):
+        doc = vector_db.docstore.search(vector_db.index_to_docstore_id[position])
+        texts.append(doc.page_content if isinstance(doc, Document) else "")
+    return LexicalIndex.build(texts)
+
+
+def attach_lexical_index(vector_db, lexical_index):
+    with _lexical_lock:
+        _lexical_indexes[vector_db] = lexical_index
+    return lexical_index
+
+
+def get_lexical_index(vector_db):
+    # Built on first use for indexes that were saved without one
+    with _lexical_lock:
+        lexical_index = _lexical_indexes.get(vector_db)
+    if lexical_index is None or lexical_index.size != vector_db.index.ntotal:
+        lexical_index = attach_lexical_index(vector_db, build_lexical_index(vector_db))
+    return lexical_index
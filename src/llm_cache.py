@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from src.common import get_encoding
+from src.telemetry import record_cache, record_stage, record_tokens, observe, log_llm_response
+from src.llm_gateway import invoke_llm, stream_llm
+
+CACHE_PATH = os.path.join("cache", "llm_responses.sqlite3")
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60  # one week
+MAX_CACHE_ENTRIES = 5000
+MAX_CACHE_BYTES = 50 * 1024 * 1024  # 50 MB of response text
+
+_write_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def llm_cache_key(model_name, temperature, rendered_prompt, params=None):
+    payload = json.dumps({
+        "model": model_name,
+        "temperature": temperature,
+        "prompt_sha256": hashlib.sha256(rendered_prompt.encode("utf-8")).hexdigest(),
+        "params": params or {},
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached_response(key, cache_path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS):
+    connection = _connect(cache_path)
+    try:
+        row = connection.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        response, created_at = row
+        now = time.time()
+        if now - created_at > ttl_seconds:
+            with _write_lock:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                connection.commit()
+            return None
+
+        with _write_lock:
+            connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            connection.commit()
+        return response
+    finally:
+        connection.close()
+
+
+def set_cached_response(key, response, cache_path=CACHE_PATH):
+    connection = _connect(cache_path)
+    try:
+        now = time.time()
+        with _write_lock:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now)
+            )
+            connection.commit()
+    finally:
+        connection.close()
+    prune_llm_cache(cache_path)
+
+
+def prune_llm_cache(cache_path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS,
+                    max_entries=MAX_CACHE_ENTRIES, max_bytes=MAX_CACHE_BYTES):
+    connection = _connect(cache_path)
+    try:
+        with _write_lock:
+            connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - ttl_seconds,))
+
+            # Least recently used first until both the entry and the size caps are met
+            count, total_bytes = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if count > max_entries or total_bytes > max_bytes:
+                rows = connection.execute("SELECT key, size FROM responses ORDER BY last_used ASC").fetchall()
+                stale_keys = []
+                for key, size in rows:
+                    if count <= max_entries and total_bytes <= max_bytes:
+                        break
+                    stale_keys.append((key,))
+                    count -= 1
+                    total_bytes -= size
+                connection.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+            connection.commit()
+    finally:
+        connection.close()
+
+
+def invoke_cached(prompt, llm, inputs, use_cache=True, validate=None, cache_path=CACHE_PATH):
+    # Renders the prompt once, and only calls the LLM when there is no fresh cached answer.
+    # `validate(text)` should raise for unusable responses so they are never cached.
+    # use_cache=False skips the lookup (regenerate) but still stores the new answer.
+    messages, key = _render(prompt, llm, inputs)
+
+    if use_cache:
+        cached = get_cached_response(key, cache_path)
+        record_cache("llm", cached is not None)
+        if cached is not None:
+            return cached
+
+    # Through the gateway: rate limits, retries, and one request for identical concurrent prompts
+    prompt_tokens = _count_prompt_tokens(messages)
+    start = time.perf_counter()
+    text = invoke_llm(llm, messages, key=key, prompt_tokens=prompt_tokens)
+    _record_call(llm, prompt_tokens, text, time.perf_counter() - start)
+
+    if validate is not None:
+        validate(text)
+    set_cached_response(key, text, cache_path)
+    return text
+
+
+def stream_cached(prompt, llm, inputs, use_cache=True, validate=None, cache_path=CACHE_PATH):
+    # Streaming version of invoke_cached: yields text pieces as the LLM produces them.
+    # A cache hit is yielded in one piece; a fresh answer is cached once the stream completes.
+    messages, key = _render(prompt, llm, inputs)
+
+    if use_cache:
+        cached = get_cached_response(key, cache_path)
+        record_cache("llm", cached is not None)
+        if cached is not None:
+            yield cached
+            return
+
+    # Timed by the LLM only, not by whatever the consumer does between pieces
+    prompt_tokens = _count_prompt_tokens(messages)
+    pieces = []
+    seconds = 0.0
+    stream = stream_llm(llm, messages, key=key, prompt_tokens=prompt_tokens)
+    while True:
+        start = time.perf_counter()
+        piece = next(stream, None)
+        seconds += time.perf_counter() - start
+        if piece is None:
+            break
+        if not pieces:
+            observe("llm_first_token", seconds, model=_model_name(llm))
+        pieces.append(piece)
+        yield piece
+
+    text = "".join(pieces)
+    _record_call(llm, prompt_tokens, text, seconds)
+    if validate is not None:
+        validate(text)
+    set_cached_response(key, text, cache_path)
+
+
+def _record_call(llm, prompt_tokens, text, seconds):
+    # Token counts are tiktoken estimates, streamed responses don't report usage
+    model = _model_name(llm)
+    completion_tokens = len(get_encoding().encode_ordinary(text))
+    record_tokens(model, prompt_tokens, completion_tokens)
+    record_stage("llm_call", seconds, {"model": model}, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    log_llm_response(model, text)
+
+
+def _count_prompt_tokens(messages):
+    encoding = get_encoding()
+    return sum(len(encoding.encode_ordinary(message.content)) for message in messages)
+
+
+def _model_name(llm):
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None)
+
+
+def _render(prompt, llm, inputs):
+    messages = prompt.format_messages(**inputs)
+    rendered_prompt = "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+    key = llm_cache_key(
+        _model_name(llm),
+        getattr(llm, "temperature", None),
+        rendered_prompt,
+        params={name: value for name, value in inputs.items() if name not in ("content", "context")}
+    )
+    return messages, key
+
+
+def _connect(cache_path):
+    directory = os.path.dirname(cache_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    connection = sqlite3.connect(cache_path, timeout=30)
+    if cache_path not in _initialized_paths:
+        with _write_lock:
+            # WAL lets readers in other sessions/processes keep going while one writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            connection.commit()
+        _initialized_paths.add(cache_path)
+    return connection
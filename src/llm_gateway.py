@@ -0,0 +1,231 @@
+import os
+import random
+import threading
+import time
+import httpx
+from langchain_openai import ChatOpenAI
+from src.telemetry import increment, log_event
+
+# Shared by every session in the process, so these are provider-account limits, not per-user ones
+REQUESTS_PER_MINUTE = int(os.getenv("STUDYMATE_LLM_RPM", "500"))
+TOKENS_PER_MINUTE = int(os.getenv("STUDYMATE_LLM_TPM", "200000"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("STUDYMATE_LLM_CONCURRENCY", "8"))
+# Empty: the OpenAI API. Point at a local mock server to test without a key or quota.
+BASE_URL = os.getenv("STUDYMATE_LLM_BASE_URL") or None
+REQUEST_TIMEOUT_SECONDS = 60
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+# Completion tokens charged up front, before the real answer length is known
+EXPECTED_COMPLETION_TOKENS = 512
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    # Refills continuously at per_minute / 60 per second, up to per_minute.
+    # acquire() blocks until `amount` is available (amounts above the capacity are capped to it).
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1.0):
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._available >= amount:
+                    self._available -= amount
+                    return
+                wait = (amount - self._available) / self.rate
+            time.sleep(wait)
+
+
+class _Flight:
+    # One in-flight request that identical concurrent requests wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.text = None
+        self.failed = False
+
+
+_request_bucket = TokenBucket(REQUESTS_PER_MINUTE)
+_token_bucket = TokenBucket(TOKENS_PER_MINUTE)
+_concurrency = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+_clients = {}
+_http_client = None
+_clients_lock = threading.Lock()
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_llm(model="gpt-3.5-turbo", temperature=0.7):
+    # One client per (model, temperature) for the whole process, all on one pooled HTTP connection set.
+    # The gateway does the retrying, so the client's own retries are off.
+    global _http_client
+    key = (model, temperature)
+    with _clients_lock:
+        llm = _clients.get(key)
+        if llm is None:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    timeout=REQUEST_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONCURRENT_REQUESTS,
+                        max_keepalive_connections=MAX_CONCURRENT_REQUESTS
+                    )
+                )
+            options = {"base_url": BASE_URL} if BASE_URL else {}
+            llm = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                max_retries=0,
+                http_client=_http_client,
+                **options
+            )
+            _clients[key] = llm
+    return llm
+
+
+def invoke_llm(llm, messages, key=None, prompt_tokens=0):
+    # Rate-limited, retried llm.invoke returning the response text.
+    # With a key, identical concurrent calls share one request (single flight).
+    flight, leader = _join_flight(key)
+    if not leader:
+        text = _wait_for_flight(flight)
+        if text is not None:
+            return text
+        flight = None
+
+    try:
+        text = _with_retries(lambda: _text(llm.invoke(messages)), prompt_tokens)
+    except BaseException:
+        _land_flight(key, flight, None)
+        raise
+    _land_flight(key, flight, text)
+    return text
+
+
+def stream_llm(llm, messages, key=None, prompt_tokens=0):
+    # Streaming version of invoke_llm. Only a stream that fails before its first piece is retried.
+    # Followers of an identical in-flight stream get the leader's full text in one piece.
+    flight, leader = _join_flight(key)
+    if not leader:
+        text = _wait_for_flight(flight)
+        if text is not None:
+            yield text
+            return
+        flight = None
+
+    pieces = []
+    try:
+        stream = _with_retries(lambda: _open_stream(llm, messages), prompt_tokens, hold_slot=False)
+        try:
+            for piece in stream:
+                pieces.append(piece)
+                yield piece
+        finally:
+            _concurrency.release()
+    except BaseException:
+        _land_flight(key, flight, None)
+        raise
+    _land_flight(key, flight, "".join(pieces))
+
+
+def _open_stream(llm, messages):
+    # Pulls the first piece inside the retry loop, so connection errors and 429s are retried.
+    # Holds a concurrency slot until the stream is finished (released by stream_llm).
+    _concurrency.acquire()
+    try:
+        chunks = iter(llm.stream(messages))
+        first = next(chunks, None)
+    except BaseException:
+        _concurrency.release()
+        raise
+
+    def pieces():
+        if first is not None:
+            yield _text(first)
+        for chunk in chunks:
+            yield _text(chunk)
+    return (piece for piece in pieces() if piece)
+
+
+def _with_retries(call, prompt_tokens, hold_slot=True):
+    # hold_slot=False for streams: they take their concurrency slot themselves, it must outlive this call
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        _request_bucket.acquire()
+        _token_bucket.acquire(prompt_tokens + EXPECTED_COMPLETION_TOKENS)
+        try:
+            if not hold_slot:
+                return call()
+            with _concurrency:
+                return call()
+        except Exception as e:
+            if attempt == MAX_ATTEMPTS or not _is_retryable(e):
+                raise
+            delay = _retry_delay(e, attempt)
+            increment("studymate_llm_retries_total", reason=type(e).__name__)
+            log_event("llm_retry", attempt=attempt, delay=round(delay, 2), error=str(e)[:200])
+            time.sleep(delay)
+
+
+def _is_retryable(error):
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # Connection resets / timeouts from the HTTP layer (wrapped or not)
+    return isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)) or \
+        type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_delay(error, attempt):
+    # Honour Retry-After when the provider sends one, otherwise full-jitter exponential backoff
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), BACKOFF_MAX_SECONDS)
+    except ValueError:
+        pass
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)))
+
+
+def _join_flight(key):
+    if key is None:
+        return None, True
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is not None:
+            increment("studymate_llm_coalesced_total")
+            return flight, False
+        flight = _flights[key] = _Flight()
+        return flight, True
+
+
+def _wait_for_flight(flight):
+    # The leader's text, or None if it failed (the follower then makes its own request)
+    flight.done.wait()
+    return None if flight.failed else flight.text
+
+
+def _land_flight(key, flight, text):
+    if flight is None:
+        return
+    with _flights_lock:
+        if _flights.get(key) is flight:
+            del _flights[key]
+    flight.text = text
+    flight.failed = text is None
+    flight.done.set()
+
+
+def _text(message):
+    return message.content if hasattr(message, "content") else str(message)
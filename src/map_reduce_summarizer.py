@@ -0,0 +1,147 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from src.llm_gateway import get_llm
+from langchain.prompts.chat import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from src.chunk_and_embed import get_all_chunks
+from src.common import get_encoding
+from src.llm_cache import invoke_cached, stream_cached
+from src.summarizer import SUMMARY_SYSTEM_TEMPLATE
+
+SUMMARY_MODEL = "gpt-3.5-turbo"
+
+# Tokens of source text per LLM call (leaves room for the prompt and the answer in a 16k context)
+BATCH_TOKEN_BUDGET = 6000
+# Below this a batch never ends early on a content-defined boundary
+MIN_BATCH_TOKENS = BATCH_TOKEN_BUDGET // 2
+# Roughly 1 in BOUNDARY_EVERY chunks can close a batch, based on its text hash
+BOUNDARY_EVERY = 4
+MAX_PARALLEL_CALLS = 4
+
+MAP_SYSTEM_TEMPLATE = """
+    You are an expert academic summarizer. The text below is one section of a longer document.
+    Write a dense summary of this section only, keeping every key point, definition, formula,
+    name and example a student would need. Use short bullet points grouped under headings (##).
+    Don't include any extra text other than the summary its self.
+    """
+
+REDUCE_SYSTEM_TEMPLATE = """
+    You are an expert academic summarizer. The text below is a set of partial summaries of
+    consecutive sections of one document. Merge them into a single summary, removing repetition
+    but keeping every key point, definition, formula and example. Keep headings (#, ##) where useful.
+    Don't include any extra text other than the summary its self.
+    """
+
+HUMAN_TEMPLATE = """
+    CONTEXT:
+    {context}
+    """
+
+
+def summarize_full_document(vector_db, use_cache=True, max_workers=MAX_PARALLEL_CALLS,
+                            progress_callback=None):
+    return "".join(stream_full_summary(vector_db, use_cache, max_workers, progress_callback))
+
+
+def stream_full_summary(vector_db, use_cache=True, max_workers=MAX_PARALLEL_CALLS,
+                        progress_callback=None):
+    # Map-reduce over every chunk in the index, not just the top matches.
+    # Batches are summarized in parallel, partial summaries are merged level by level,
+    # and the final merge is streamed. progress_callback(stage, done, total).
+    llm = get_llm(SUMMARY_MODEL, temperature=0.3)
+    encoding = get_encoding(SUMMARY_MODEL)
+
+    texts = [chunk.page_content for chunk in get_all_chunks(vector_db)]
+    if not texts:
+        return
+
+    # Map: summarize each batch of source text
+    batches = token_batches(texts, encoding)
+    if len(batches) == 1:
+        # Short document: one normal summary, same as the quick mode
+        yield from stream_cached(_prompt(SUMMARY_SYSTEM_TEMPLATE), llm, {"context": batches[0]}, use_cache=use_cache)
+        return
+    partials = _summarize_batches(batches, MAP_SYSTEM_TEMPLATE, llm, use_cache, max_workers,
+                                  progress_callback, "map")
+
+    # Reduce: merge partial summaries until they fit into one call
+    level = 0
+    while True:
+        groups = token_batches(partials, encoding)
+        if len(groups) == 1:
+            break
+        if len(groups) >= len(partials):
+            # Partials too long to pack together, merge them in pairs so every level still shrinks
+            groups = ["\n\n".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+        level += 1
+        partials = _summarize_batches(groups, REDUCE_SYSTEM_TEMPLATE, llm, use_cache, max_workers,
+                                      progress_callback, f"reduce {level}")
+
+    if progress_callback:
+        progress_callback("final", 0, 1)
+    yield from stream_cached(_prompt(SUMMARY_SYSTEM_TEMPLATE), llm, {"context": groups[0]}, use_cache=use_cache)
+
+
+def token_batches(texts, encoding=None, token_budget=BATCH_TOKEN_BUDGET):
+    # Packs texts into batches of at most `token_budget` tokens (a single oversize text gets its own batch).
+    # Besides the size limit, a batch may also end after a text whose hash hits the boundary rule,
+    # so an edit early in the document only changes the batches around it - the others keep
+    # the same content and their cached summaries are reused on the next run.
+    if encoding is None:
+        encoding = get_encoding(SUMMARY_MODEL)
+    token_counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+    min_tokens = min(MIN_BATCH_TOKENS, token_budget // 2)
+
+    batches = []
+    current = []
+    current_tokens = 0
+    for text, tokens in zip(texts, token_counts):
+        if current and current_tokens + tokens > token_budget:
+            batches.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+
+        current.append(text)
+        current_tokens += tokens
+
+        if current_tokens >= min_tokens and _is_boundary(text):
+            batches.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+
+    if current:
+        batches.append("\n\n".join(current))
+    return batches
+
+
+def _summarize_batches(batches, system_template, llm, use_cache, max_workers, progress_callback, stage):
+    prompt = _prompt(system_template)
+    results = [None] * len(batches)
+    done = 0
+
+    if progress_callback:
+        progress_callback(stage, 0, len(batches))
+
+    # Bounded parallelism: at most max_workers requests in flight
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(invoke_cached, prompt, llm, {"context": batch}, use_cache=use_cache): position
+            for position, batch in enumerate(batches)
+        }
+        for future, position in futures.items():
+            results[position] = future.result()
+            done += 1
+            if progress_callback:
+                progress_callback(stage, done, len(batches))
+    return results
+
+
+def _prompt(system_template):
+    return ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(system_template),
+        HumanMessagePromptTemplate.from_template(HUMAN_TEMPLATE)
+    ])
+
+
+def _is_boundary(text):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return digest[0] % BOUNDARY_EVERY == 0
@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.common import spawn_context
+from src.chunk_and_embed import iter_chunks, embed_and_store, EMBEDDING_MODEL, CHUNKER
+from src.document_loader import iter_document_pages
+
+
+def load_and_chunk_file(file_path, chunk_size=None, chunk_overlap=None, chunker=CHUNKER):
+    # Runs inside a worker process: PDF/DOCX parsing is CPU bound and holds the GIL
+    file_name = os.path.basename(file_path)
+    chunks = []
+    # Already one file per process, no nested page-level pool
+    for chunk in iter_chunks(iter_document_pages(file_path, max_workers=1), chunk_size, chunk_overlap, chunker):
+        chunk.metadata["source_file"] = file_name
+        chunks.append(chunk)
+    return chunks
+
+
+def iter_chunks_parallel(file_paths, chunk_size=None, chunk_overlap=None, chunker=CHUNKER,
+                         max_workers=None, progress_callback=None):
+    # Yields chunks file by file as workers finish, so embedding can start before all files are parsed
+    # progress_callback(files_done, total_files)
+    total_files = len(file_paths)
+    if max_workers is None:
+        max_workers = min(total_files, os.cpu_count() or 1)
+
+    # Nothing to parallelise, skip the pool start-up cost
+    if total_files <= 1 or max_workers <= 1:
+        for files_done, file_path in enumerate(file_paths, start=1):
+            yield from load_and_chunk_file(file_path, chunk_size, chunk_overlap, chunker)
+            if progress_callback:
+                progress_callback(files_done, total_files)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=spawn_context()) as pool:
+        futures = [
+            pool.submit(load_and_chunk_file, file_path, chunk_size, chunk_overlap, chunker)
+            for file_path in file_paths
+        ]
+        for files_done, future in enumerate(as_completed(futures), start=1):
+            yield from future.result()
+            if progress_callback:
+                progress_callback(files_done, total_files)
+
+
+def ingest_files(file_paths, persist_path="db", chunk_size=None, chunk_overlap=None, chunker=CHUNKER,
+                 model_name=EMBEDDING_MODEL, max_workers=None, progress_callback=None):
+    # Parse + chunk in parallel, then one batched embedding pass into a single FAISS index.
+    # Every chunk keeps its file name in metadata["source_file"].
+    chunks = iter_chunks_parallel(
+        file_paths,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        chunker=chunker,
+        max_workers=max_workers,
+        progress_callback=progress_callback
+    )
+    return embed_and_store(chunks, persist_path=persist_path, model_name=model_name)
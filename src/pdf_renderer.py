@@ -0,0 +1,98 @@
+import functools
+import hashlib
+import io
+import os
+import tempfile
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from src.common import prune_files, touch
+from src.telemetry import record_cache, stage
+
+PDF_CACHE_DIR = os.path.join("cache", "summary_pdfs")
+MAX_CACHED_PDFS = 100
+# Bump when the layout changes so old cached PDFs aren't served
+RENDER_VERSION = "1"
+
+
+@functools.lru_cache(maxsize=1)
+def _styles():
+    # Built once per process; styles are only read while rendering, so threads can share them
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'SummaryTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        alignment=1,
+        spaceAfter=20
+    )
+    return {
+        "title": title_style,
+        "heading": styles['Heading2'],
+        "subheading": styles['Heading3'],
+        "body": styles['Normal'],
+    }
+
+
+def render_summary_pdf(summary_text, doc_title):
+    # The summary as PDF bytes, built in memory
+    styles = _styles()
+    story = [Paragraph(f"{doc_title}", styles["title"])]
+
+    for line in summary_text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('#'):
+            # title
+            story.append(Paragraph(line.lstrip('#').strip(), styles["heading"]))
+        elif line.isupper() and len(line) > 3:
+            # subtitle
+            story.append(Paragraph(line, styles["subheading"]))
+        else:
+            # paragraph
+            story.append(Paragraph(line, styles["body"]))
+            story.append(Spacer(1, 10))
+
+    buffer = io.BytesIO()
+    with stage("pdf_render") as fields:
+        SimpleDocTemplate(buffer, pagesize=letter).build(story)
+        fields["bytes"] = buffer.tell()
+    return buffer.getvalue()
+
+
+def get_summary_pdf(summary_text, doc_title):
+    # Path of the rendered PDF, cached by content: the same summary and title are rendered once
+    os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+    pdf_path = os.path.join(PDF_CACHE_DIR, f"{summary_pdf_key(summary_text, doc_title)}.pdf")
+
+    hit = os.path.exists(pdf_path)
+    record_cache("summary_pdf", hit)
+    if hit:
+        touch(pdf_path)
+        return pdf_path
+
+    # Unique per render: job threads in one process may render the same summary at the same time
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(render_summary_pdf(summary_text, doc_title))
+        os.replace(tmp_path, pdf_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _prune_pdf_cache(keep=pdf_path)
+    return pdf_path
+
+
+def summary_pdf_key(summary_text, doc_title):
+    hasher = hashlib.sha256(RENDER_VERSION.encode("utf-8"))
+    for part in (doc_title, summary_text):
+        hasher.update(b"\0" + part.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _prune_pdf_cache(max_files=MAX_CACHED_PDFS, keep=None):
+    prune_files(PDF_CACHE_DIR, (".pdf",), max_files, keep=keep)
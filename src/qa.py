@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from src.llm_gateway import get_llm
+from langchain.prompts.chat import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
+from src.chunk_and_embed import get_embeddings
+from src.llm_cache import stream_cached
+from src.hybrid_search import hybrid_search
+from src.telemetry import observe, record_cache, record_stage
+
+QA_MODEL = "gpt-3.5-turbo"
+DEFAULT_K = 4
+MMR_FETCH_K = 20
+MAX_CACHED_QUERIES = 1024
+
+QA_SYSTEM_TEMPLATE = """
+    You are a helpful study assistant. Answer the student's question using ONLY the notes below.
+    If the notes don't contain the answer, say that you couldn't find it in their notes.
+    Keep the answer clear and concise, and use formulas or short lists where they help.
+    """
+
+QA_HUMAN_TEMPLATE = """
+    NOTES:
+    {context}
+
+    QUESTION:
+    {question}
+    """
+
+# Query embeddings are cheap to keep and students repeat questions a lot
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def embed_query_cached(embeddings, question):
+    key = (getattr(embeddings, "model_name", None), question.strip())
+    with _query_cache_lock:
+        vector = _query_cache.get(key)
+        if vector is not None:
+            _query_cache.move_to_end(key)
+            record_cache("query_embedding", True)
+            return vector
+
+    record_cache("query_embedding", False)
+    vector = embeddings.embed_query(question)
+
+    with _query_cache_lock:
+        _query_cache[key] = vector
+        if len(_query_cache) > MAX_CACHED_QUERIES:
+            _query_cache.popitem(last=False)
+    return vector
+
+
+def retrieve_for_question(vector_db, question, k=DEFAULT_K, use_mmr=False, fetch_k=MMR_FETCH_K):
+    # Returns (docs, timings) with the embed and search time in seconds
+    embeddings = getattr(vector_db, "embeddings", None) or get_embeddings()
+
+    start = time.perf_counter()
+    query_vector = embed_query_cached(embeddings, question)
+    embed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if use_mmr:
+        # Re-rank a wider candidate set for diversity so k chunks don't all say the same thing
+        docs = vector_db.max_marginal_relevance_search_by_vector(query_vector, k=k, fetch_k=max(fetch_k, k))
+    else:
+        # Vector + BM25 ranks fused, so exact terms in the question are not missed
+        docs = hybrid_search(vector_db, question, query_vector, k=k)
+    search_seconds = time.perf_counter() - start
+
+    observe("retrieval_embed", embed_seconds)
+    record_stage("retrieval", embed_seconds + search_seconds, {"mmr": use_mmr}, k=k, search_seconds=round(search_seconds, 4))
+    return docs, {"embed": embed_seconds, "search": search_seconds}
+
+
+def answer_question(vector_db, question, k=DEFAULT_K, use_mmr=False, use_cache=True):
+    # Returns (docs, answer_stream, timings). Iterate answer_stream to get the answer text;
+    # timings gets "first_token" and "llm" (seconds) filled in while it is consumed.
+    docs, timings = retrieve_for_question(vector_db, question, k=k, use_mmr=use_mmr)
+    context = "\n\n".join(doc.page_content for doc in docs)
+
+    llm = get_llm(QA_MODEL, temperature=0)
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessagePromptTemplate.from_template(QA_SYSTEM_TEMPLATE),
+        HumanMessagePromptTemplate.from_template(QA_HUMAN_TEMPLATE)
+    ])
+
+    def answer_stream():
+        start = time.perf_counter()
+        for piece in stream_cached(prompt, llm, {"context": context, "question": question}, use_cache=use_cache):
+            if "first_token" not in timings:
+                timings["first_token"] = time.perf_counter() - start
+            yield piece
+        timings["llm"] = time.perf_counter() - start
+
+    return docs, answer_stream(), timings
@@ -1,15 +1,9 @@
 import os
-import json
 from langchain.prompts.chat import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain_openai import ChatOpenAI
+from src.llm_gateway import get_llm
+from src.batch_generation import generate_items
 
-def generate_mcqs(vector_db, num_mcqs=8):
-    # Get content from the vector database
-    retriever = vector_db.as_retriever(search_kwargs={"k": 5})
-    docs = retriever.get_relevant_documents("generate comprehensive multiple choice questions")
-    
-    content = " ".join([doc.page_content for doc in docs])
-    
+def generate_mcqs(vector_db, num_mcqs=8, docs=None, use_cache=True):
     # Create a prompt template for flashcard generation
     system_template = """
     You are an assistant generating study material. Follow these formatting rules strictly:
@@ -42,23 +36,36 @@ def generate_mcqs(vector_db, num_mcqs=8):
     """
     
     # Set up the LLM chain
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0.5,
-    )
+    llm = get_llm("gpt-3.5-turbo", temperature=0.5)
 
     prompt = ChatPromptTemplate.from_messages([
         SystemMessagePromptTemplate.from_template(system_template),
         HumanMessagePromptTemplate.from_template(human_template)
     ])
 
-    chain = prompt | llm
-    response = chain.invoke({"content": content, "num_mcqs": num_mcqs})
+    # Split over parallel calls (each on its own part of the notes, cached separately),
+    # parsed as the responses stream in, near-duplicate items dropped.
+    # Content is a coverage sample of the document unless docs were passed in (e.g. for a study pack).
+    mcqs = generate_items(
+        vector_db,
+        prompt,
+        llm,
+        "num_mcqs",
+        num_mcqs,
+        docs=docs,
+        use_cache=use_cache,
+        is_valid=is_valid_mcq,
+        dedupe_text=lambda mcq: mcq["question"]
+    )
+
+    return mcqs
 
-    print("LLM RAW RESPONSE:\n", response)
-    
-    mcqs = []
-    response_text = response.content.strip()
-    mcqs = json.loads(response_text)
 
-    return mcqs
\ No newline at end of file
+def is_valid_mcq(mcq):
+    if not isinstance(mcq, dict) or not isinstance(mcq.get("options"), dict):
+        return False
+    return (
+        isinstance(mcq.get("question"), str) and mcq["question"].strip() != ""
+        and len(mcq["options"]) >= 2
+        and mcq.get("correct_option") in mcq["options"]
+    )
@@ -0,0 +1,68 @@
+import importlib
+import threading
+import time
+from src.telemetry import get_logger, log_event, record_stage
+
+# Process-wide cache for expensive objects (heavy modules, models, clients): each one is created once,
+# on first use, and shared by every session and rerun. Lets app.py keep its own imports light.
+_resources = {}
+_resource_locks = {}
+_registry_lock = threading.Lock()
+
+# Top-level packages of this repo: a missing one of these is a bug, not an optional dependency
+PROJECT_PACKAGES = ("src", "benchmarks")
+
+
+def get_resource(name, factory):
+    # factory() runs at most once per name, concurrent callers wait for it.
+    # A factory that raises isn't cached, the next call tries again.
+    if name in _resources:
+        return _resources[name]
+
+    with _registry_lock:
+        resource_lock = _resource_locks.setdefault(name, threading.Lock())
+
+    with resource_lock:
+        if name not in _resources:
+            start = time.perf_counter()
+            _resources[name] = factory()
+            record_stage("resource_load", time.perf_counter() - start, {"resource": name})
+    return _resources[name]
+
+
+def load_module(module_name):
+    # importlib.import_module, timed on first import; raises ImportError if a dependency is missing
+    return get_resource(f"module:{module_name}", lambda: importlib.import_module(module_name))
+
+
+def optional_module(module_name):
+    # The module, or None when a third-party package it needs isn't installed.
+    # Any other ImportError (a broken import inside src/, a missing name) is a bug and is raised.
+    try:
+        return load_module(module_name)
+    except ModuleNotFoundError as e:
+        if not is_missing_package(e):
+            raise
+        log_event("module_unavailable", module=module_name, missing=e.name)
+        return None
+
+
+def is_missing_package(error):
+    # True for "No module named 'torch'", False for modules of this project
+    if not isinstance(error, ModuleNotFoundError) or not error.name:
+        return False
+    return error.name.split(".")[0] not in PROJECT_PACKAGES
+
+
+def preload_modules(module_names):
+    # Imports ahead of first use (e.g. on a background thread while the first page is on screen).
+    # Errors are logged, the module is imported again (and fails visibly) on first use.
+    for module_name in module_names:
+        try:
+            optional_module(module_name)
+        except Exception:
+            get_logger().exception("module_preload_failed", extra={"fields": {"module": module_name}})
+
+
+def loaded_resources():
+    return sorted(_resources)
@@ -0,0 +1,97 @@
+import time
+from src.index_cache import get_or_build_index, get_or_build_multi_index
+from src.index_manager import get_index
+from src.flashcard_generator import generate_flashcards
+from src.quiz_generator import generate_mcqs
+from src.summarizer import stream_summary
+from src.pdf_renderer import get_summary_pdf
+from src.map_reduce_summarizer import stream_full_summary
+from src.study_pack import generate_study_pack
+
+# Job functions for src.job_queue: they run on worker threads, so no Streamlit calls in here.
+# Each takes the Job as its first argument and returns a JSON-serialisable result.
+
+# How often streamed summary text is pushed to the job, polling is slower than that anyway
+PARTIAL_UPDATE_SECONDS = 0.25
+
+
+def process_documents_job(job, file_paths, document_name=None):
+    def update_progress(done, total, verb, unit):
+        if total:
+            job.report(progress=min(done / total, 1.0), message=f"{verb} {unit} {done} of {total}")
+        else:
+            job.report(progress=0.5, message=f"{verb} {done} {unit}s...")
+
+    job.report(progress=0.0, message="Reading files...")
+    if len(file_paths) == 1:
+        # Single file: streamed page by page. Reuses the saved index if this exact file
+        # was processed before, and only re-embeds changed chunks for a new version of it
+        index_key, _, cache_hit = get_or_build_index(
+            file_paths[0],
+            document_name=document_name,
+            progress_callback=lambda done, total: update_progress(done, total, "Read", "page")
+        )
+    else:
+        # Several files: parsed in parallel, merged into one index
+        index_key, _, cache_hit = get_or_build_multi_index(
+            file_paths,
+            progress_callback=lambda done, total: update_progress(done, total, "Parsed", "file")
+        )
+    return {"index_key": index_key, "cache_hit": cache_hit}
+
+
+def flashcards_job(job, index_key, num_cards, use_cache=True):
+    job.report(message="Generating flashcards from your notes...")
+    return generate_flashcards(get_index(index_key), num_cards=num_cards, use_cache=use_cache)
+
+
+def quiz_job(job, index_key, num_mcqs, use_cache=True):
+    job.report(message="Generating questions from your notes...")
+    return generate_mcqs(get_index(index_key), num_mcqs=num_mcqs, use_cache=use_cache)
+
+
+def summary_job(job, index_key, doc_title, whole_document=False, use_cache=True):
+    vector_db = get_index(index_key)
+    if whole_document:
+        # Map-reduce over every chunk: section summaries first, then the streamed final merge
+        def update_summary_progress(stage, done, total):
+            if stage == "final":
+                job.report(progress=0.9, message="Writing the summary...")
+            else:
+                job.report(progress=0.9 * done / total if total else 0.0, message=f"Summarizing ({stage}): {done} of {total}")
+
+        job.report(message="Summarizing sections...")
+        summary_stream = stream_full_summary(vector_db, use_cache=use_cache, progress_callback=update_summary_progress)
+    else:
+        job.report(message="Writing the summary...")
+        summary_stream = stream_summary(vector_db, use_cache=use_cache)
+
+    pieces = []
+    last_update = 0.0
+    for piece in summary_stream:
+        pieces.append(piece)
+        now = time.monotonic()
+        if now - last_update >= PARTIAL_UPDATE_SECONDS:
+            job.report(partial="".join(pieces))
+            last_update = now
+    summary_text = "".join(pieces)
+
+    job.report(progress=0.95, message="Building PDF...", partial=summary_text)
+    pdf_path = get_summary_pdf(summary_text, doc_title)
+    return {"summary": summary_text, "pdf_path": pdf_path}
+
+
+def study_pack_job(job, index_key, num_cards, num_mcqs, doc_title, use_cache=True):
+    # partial and result: {name: {"result": ..., "error": ...}} for flashcards / quiz / summary
+    results = {}
+    job.report(progress=0.0, message="Generating study pack...", partial={})
+    for name, result, error in generate_study_pack(
+        get_index(index_key),
+        num_cards=num_cards,
+        num_mcqs=num_mcqs,
+        doc_title=doc_title,
+        use_cache=use_cache
+    ):
+        results[name] = {"result": result, "error": str(error) if error is not None else None}
+        job.report(progress=len(results) / 3, partial=dict(results))
+    return results
@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.coverage_sampler import sample_chunks
+from src.flashcard_generator import generate_flashcards
+from src.quiz_generator import generate_mcqs
+from src.summarizer import summarize_document
+
+
+def generate_study_pack(vector_db, num_cards=8, num_mcqs=8, doc_title="Document Summary", use_cache=True):
+    # One coverage sample shared by all three generators, then the LLM calls run concurrently.
+    # Yields (name, result, error) as each one finishes, so total time ~ the slowest call.
+    docs = sample_chunks(vector_db, max(num_cards, num_mcqs))
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = {
+            pool.submit(generate_flashcards, vector_db, num_cards, docs=docs, use_cache=use_cache): "flashcards",
+            pool.submit(generate_mcqs, vector_db, num_mcqs, docs=docs, use_cache=use_cache): "quiz",
+            pool.submit(summarize_document, vector_db, doc_title, docs=docs, use_cache=use_cache): "summary",
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                yield name, future.result(), None
+            except Exception as e:
+                # One failed call shouldn't throw away the others
+                yield name, None, e
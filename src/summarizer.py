@@ -1,21 +1,11 @@
-from langchain_openai import ChatOpenAI
+from src.llm_gateway import get_llm
 from langchain.prompts.chat import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-import tempfile
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from src.llm_cache import invoke_cached, stream_cached
+from src.chunk_and_embed import get_embeddings
+from src.qa import embed_query_cached
+from src.pdf_renderer import get_summary_pdf
 
-def summarize_document(vector_db, doc_title="Summary"):
-    retriever = vector_db.as_retriever(search_kwargs={"k": 5})
-
-    try:
-        docs = retriever.invoke("generate comprehensive document summary")
-    except (AttributeError, TypeError):
-        docs = retriever.get_relevant_documents("generate comprehensive document summary")
-    
-    context = " ".join([doc.page_content for doc in docs])
-
-    system_template = """
+SUMMARY_SYSTEM_TEMPLATE = """
     You are an expert academic summarizer. Your task is: given text (context) from a document, 
     create a comprehensive, well-structured summary that captures all of the key points, 
     main concepts, and important details to help a student learn about what was included in the document
@@ -28,79 +18,43 @@ def summarize_document(vector_db, doc_title="Summary"):
     Don't include any extra text (e.g. "Here's your summary...") other than the summary its self.
     """
 
+SUMMARY_QUERY = "generate comprehensive document summary"
+
+def summarize_document(vector_db, doc_title="Summary", docs=None, use_cache=True):
+    prompt, llm, inputs = _prepare_summary(vector_db, docs)
+
+    # Identical context reuses the cached answer instead of a new API call
+    summary_text = invoke_cached(prompt, llm, inputs, use_cache=use_cache)
+    
+    pdf_path = get_summary_pdf(summary_text, doc_title)
+
+    return summary_text, pdf_path
+
+def stream_summary(vector_db, docs=None, use_cache=True):
+    # Yields summary text as it is generated; join the pieces (or use st.write_stream's
+    # return value) and pass it to get_summary_pdf once the stream is done
+    prompt, llm, inputs = _prepare_summary(vector_db, docs)
+    yield from stream_cached(prompt, llm, inputs, use_cache=use_cache)
+
+def _prepare_summary(vector_db, docs=None):
+    if docs is None:
+        # Fixed query: its vector is cached, and plain dense search is used because BM25 on these
+        # words says nothing about the document
+        embeddings = getattr(vector_db, "embeddings", None) or get_embeddings()
+        docs = vector_db.similarity_search_by_vector(embed_query_cached(embeddings, SUMMARY_QUERY), k=5)
+    
+    context = " ".join([doc.page_content for doc in docs])
+
     human_template = """
     CONTEXT:
     {context}
     """
 
-    llm = ChatOpenAI(
-        model="gpt-3.5-turbo",
-        temperature=0.3,
-    )
+    llm = get_llm("gpt-3.5-turbo", temperature=0.3)
 
     prompt = ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(system_template),
+        SystemMessagePromptTemplate.from_template(SUMMARY_SYSTEM_TEMPLATE),
         HumanMessagePromptTemplate.from_template(human_template)
     ])
 
-    chain = prompt | llm
-    response = chain.invoke({"context": context})
-
-    if hasattr(response, 'content'):
-        summary_text = response.content
-    else:
-        summary_text = str(response)
-    
-    pdf_path = generate_summary_pdf(summary_text, doc_title)
-
-    return summary_text, pdf_path
-
-    
-
-def generate_summary_pdf(summary_text, doc_title):
-    # temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    pdf_path = temp_file.name
-    temp_file.close()
-    
-    # PDF document
-    doc = SimpleDocTemplate(pdf_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
-    # Define custom styles presets for document
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Heading1'],
-        fontSize=18,
-        alignment=1,
-        spaceAfter=20
-    )
-    
-    lines = summary_text.split('\n')
-    story = []
-    
-    # Doc title
-    story.append(Paragraph(f"{doc_title}", title_style))
-    
-    # Process summary content with heading formatting
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        if line.startswith('#'):
-            # title
-            heading = line.lstrip('#').strip()
-            story.append(Paragraph(heading, styles['Heading2']))
-        elif line.isupper() and len(line) > 3:
-            # subtitle
-            story.append(Paragraph(line, styles['Heading3']))
-        else:
-            # paragraph
-            story.append(Paragraph(line, styles['Normal']))
-            story.append(Spacer(1, 10))
-    
-    # Build the PDF
-    doc.build(story)
-    
-    return pdf_path
\ No newline at end of file
+    return prompt, llm, {"context": context}
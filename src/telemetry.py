@@ -0,0 +1,272 @@
+import contextlib
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOG_LEVEL = os.getenv("STUDYMATE_LOG_LEVEL", "INFO").upper()
+# Share of raw LLM responses written to the debug log
+RESPONSE_LOG_SAMPLE_RATE = float(os.getenv("STUDYMATE_RESPONSE_LOG_SAMPLE_RATE", "0.05"))
+RESPONSE_LOG_MAX_CHARS = 2000
+METRICS_FILE = os.getenv("STUDYMATE_METRICS_FILE", os.path.join("metrics", "studymate.prom"))
+# The metrics file is rewritten at most this often
+METRICS_WRITE_SECONDS = 5.0
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_metrics_lock = threading.Lock()
+# (stage, labels) -> [bucket counts..., count, sum]
+_histograms = {}
+# (name, labels) -> value
+_counters = {}
+_gauges = {}
+_last_metrics_write = 0.0
+_metrics_server = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+@functools.lru_cache(maxsize=None)
+def get_logger(name="studymate"):
+    # One JSON line per event on stderr
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
+
+
+def log_event(message, level=logging.INFO, **fields):
+    logger = get_logger()
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"fields": fields})
+
+
+@contextlib.contextmanager
+def stage(name, log=True, **labels):
+    # Times the block and records it under the stage histogram (labels become metric labels, keep them
+    # low-cardinality). The block can add log-only fields to the yielded dict, e.g. fields["chunks"] = n.
+    # log=False for hot paths that run many times per request (metrics only).
+    fields = {}
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record_stage(name, time.perf_counter() - start, labels, log=log, **fields)
+
+
+def record_stage(name, seconds, labels=None, log=True, **fields):
+    # For stages timed by the caller, e.g. accumulated over a streamed pipeline
+    labels = labels or {}
+    observe(name, seconds, **labels)
+    if log:
+        rss = current_rss_bytes()
+        # ru_maxrss is only updated now and then, never report a peak below the current RSS
+        peak = max(peak_rss_bytes(), rss)
+        set_gauge("studymate_rss_bytes", rss)
+        set_gauge("studymate_peak_rss_bytes", peak)
+        log_event(
+            "stage",
+            stage=name,
+            seconds=round(seconds, 4),
+            rss_mb=round(rss / (1024 * 1024), 1),
+            peak_rss_mb=round(peak / (1024 * 1024), 1),
+            **labels,
+            **fields
+        )
+
+
+def observe(stage_name, seconds, **labels):
+    key = (stage_name, _label_key(labels))
+    with _metrics_lock:
+        values = _histograms.get(key)
+        if values is None:
+            values = _histograms[key] = [0] * (len(STAGE_BUCKETS) + 2)
+        for position, bound in enumerate(STAGE_BUCKETS):
+            if seconds <= bound:
+                values[position] += 1
+        values[-2] += 1
+        values[-1] += seconds
+    _maybe_write_metrics()
+
+
+def increment(name, value=1, **labels):
+    key = (name, _label_key(labels))
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _metrics_lock:
+        _gauges[(name, _label_key(labels))] = value
+
+
+def record_cache(cache, hit):
+    increment("studymate_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_tokens(model, prompt_tokens, completion_tokens):
+    increment("studymate_llm_tokens_total", prompt_tokens, model=model, direction="prompt")
+    increment("studymate_llm_tokens_total", completion_tokens, model=model, direction="completion")
+
+
+def log_llm_response(kind, text, sample_rate=None):
+    # Sampled so debug logging doesn't dump every completion
+    sample_rate = RESPONSE_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    logger = get_logger()
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < sample_rate:
+        log_event(
+            "llm_response",
+            level=logging.DEBUG,
+            kind=kind,
+            chars=len(text),
+            response=text[:RESPONSE_LOG_MAX_CHARS]
+        )
+
+
+def cache_hit_rates():
+    # cache -> hit share of all lookups so far
+    totals = {}
+    with _metrics_lock:
+        for (name, labels), value in _counters.items():
+            if name != "studymate_cache_requests_total":
+                continue
+            labels = dict(labels)
+            hits, total = totals.get(labels["cache"], (0, 0))
+            totals[labels["cache"]] = (hits + (value if labels["result"] == "hit" else 0), total + value)
+    return {cache: hits / total for cache, (hits, total) in totals.items() if total}
+
+
+def render_metrics():
+    # Prometheus text exposition format
+    lines = []
+    with _metrics_lock:
+        histograms = {key: list(values) for key, values in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    lines.append("# TYPE studymate_stage_seconds histogram")
+    for (stage_name, labels), values in sorted(histograms.items()):
+        base = dict(labels, stage=stage_name)
+        for bound, count in zip(STAGE_BUCKETS, values):
+            lines.append(f"studymate_stage_seconds_bucket{_format_labels(dict(base, le=bound))} {count}")
+        lines.append(f"studymate_stage_seconds_bucket{_format_labels(dict(base, le='+Inf'))} {values[-2]}")
+        lines.append(f"studymate_stage_seconds_count{_format_labels(base)} {values[-2]}")
+        lines.append(f"studymate_stage_seconds_sum{_format_labels(base)} {values[-1]:.6f}")
+
+    for metric_type, values in (("counter", counters), ("gauge", gauges)):
+        for name in sorted({name for name, _ in values}):
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (metric_name, labels), value in sorted(values.items()):
+                if metric_name == name:
+                    lines.append(f"{name}{_format_labels(dict(labels))} {value}")
+
+    lines.append("# TYPE studymate_cache_hit_ratio gauge")
+    for cache, ratio in sorted(cache_hit_rates().items()):
+        lines.append(f"studymate_cache_hit_ratio{_format_labels({'cache': cache})} {ratio:.4f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path=METRICS_FILE):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render_metrics())
+    os.replace(tmp_path, path)
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    # GET /metrics on a daemon thread, once per process
+    global _metrics_server
+    if _metrics_server is not None:
+        return _metrics_server
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _metrics_server
+
+
+def current_rss_bytes():
+    # Linux: resident pages from /proc, otherwise fall back to peak RSS
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def _maybe_write_metrics():
+    global _last_metrics_write
+    # Worker processes only see their own share, the file belongs to the main process
+    if multiprocessing.parent_process() is not None:
+        return
+    now = time.monotonic()
+    if now - _last_metrics_write < METRICS_WRITE_SECONDS:
+        return
+    _last_metrics_write = now
+    try:
+        write_metrics_file()
+    except OSError as e:
+        log_event("metrics_write_failed", level=logging.WARNING, error=str(e))
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
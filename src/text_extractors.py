@@ -0,0 +1,246 @@
+import collections
+import contextlib
+import importlib.util
+import itertools
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from src.common import hash_file, prune_files, spawn_context, touch
+from src.telemetry import record_cache, record_stage
+
+TEXT_CACHE_DIR = os.path.join("cache", "extracted_text")
+MAX_TEXT_CACHE_FILES = 200
+# Pages per worker task, and the smallest PDF worth starting worker processes for
+PAGES_PER_TASK = 16
+PARALLEL_MIN_PAGES = 48
+
+# extension -> extractors, fastest first
+_extractors = {}
+
+
+class Extractor:
+    # extract(file_path, start, end) yields page texts; paged formats also give count_pages(file_path).
+    # Non-paged formats (DOCX) yield the whole document as one page and ignore start/end.
+
+    def __init__(self, name, module, extract, count_pages=None, priority=0):
+        self.name = name
+        self.module = module
+        self.extract = extract
+        self.count_pages = count_pages
+        self.priority = priority
+
+    @property
+    def paged(self):
+        return self.count_pages is not None
+
+    def is_available(self):
+        return importlib.util.find_spec(self.module) is not None
+
+
+def register_extractor(extension, extractor):
+    extractors = _extractors.setdefault(extension.lower(), [])
+    extractors.append(extractor)
+    extractors.sort(key=lambda candidate: candidate.priority, reverse=True)
+
+
+def get_extractor(file_path, backend=None):
+    # Fastest installed backend for the file type, or the named one
+    extension = os.path.splitext(file_path)[1].lower()
+    candidates = _extractors.get(extension)
+    if not candidates:
+        raise ValueError("Unsupported file format.")
+    for extractor in candidates:
+        if (backend is None or extractor.name == backend) and extractor.is_available():
+            return extractor
+    raise ValueError(f"No installed text extractor for {extension} files" + (f" named {backend}" if backend else ""))
+
+
+def available_extractors(extension):
+    return [extractor.name for extractor in _extractors.get(extension.lower(), []) if extractor.is_available()]
+
+
+def extract_pages(file_path, backend=None, max_workers=None, use_cache=True):
+    # Yields (page_number, text), page numbers 0-based like PyPDFLoader.
+    # Extracted text is cached by file content hash, so re-processing a file skips parsing.
+    # The cache is read and written a page at a time, a document's text never sits in memory as a whole.
+    extractor = get_extractor(file_path, backend)
+
+    cache_path = None
+    if use_cache:
+        cache_path = os.path.join(TEXT_CACHE_DIR, f"{hash_file(file_path).hexdigest()}-{extractor.name}.jsonl")
+        cache_file = _open_text_cache(cache_path)
+        record_cache("extracted_text", cache_file is not None)
+        if cache_file is not None:
+            with cache_file:
+                for page_number, line in enumerate(cache_file):
+                    yield page_number, json.loads(line)
+            return
+
+    # Timed by extraction only, the consumer (chunking, embedding) runs in between
+    with _text_cache_writer(cache_path) as write_page:
+        pages = 0
+        seconds = 0.0
+        page_iter = _extract(extractor, file_path, max_workers)
+        while True:
+            start = time.perf_counter()
+            text = next(page_iter, None)
+            seconds += time.perf_counter() - start
+            if text is None:
+                break
+            write_page(text)
+            yield pages, text
+            pages += 1
+        record_stage("load", seconds, {"backend": extractor.name}, pages=pages)
+
+
+def count_pages(file_path):
+    # Cheap page count for progress bars, None when unknown
+    try:
+        extractor = get_extractor(file_path)
+        return extractor.count_pages(file_path) if extractor.paged else None
+    except Exception:
+        return None
+
+
+def _extract(extractor, file_path, max_workers):
+    total_pages = extractor.count_pages(file_path) if extractor.paged else None
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if total_pages is not None:
+        max_workers = min(max_workers, math.ceil(total_pages / PAGES_PER_TASK))
+
+    # Small files and non-paged formats: the pool start-up would cost more than it saves
+    if total_pages is None or total_pages < PARALLEL_MIN_PAGES or max_workers <= 1:
+        yield from extractor.extract(file_path, 0, total_pages)
+        return
+
+    # Page ranges in parallel, yielded in page order.
+    # At most max_workers ranges are in flight: extraction can't run ahead of the consumer by more than that.
+    ranges = iter([(start, min(start + PAGES_PER_TASK, total_pages)) for start in range(0, total_pages, PAGES_PER_TASK)])
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=spawn_context()) as pool:
+        futures = collections.deque(
+            pool.submit(_extract_range, extractor.name, file_path, start, end)
+            for start, end in itertools.islice(ranges, max_workers)
+        )
+        while futures:
+            pages = futures.popleft().result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                futures.append(pool.submit(_extract_range, extractor.name, file_path, *next_range))
+            yield from pages
+
+
+def _extract_range(backend, file_path, start, end):
+    # Runs inside a worker process
+    return list(get_extractor(file_path, backend).extract(file_path, start, end))
+
+
+def _open_text_cache(cache_path):
+    # One JSON string per line, one line per page; None on a miss
+    try:
+        cache_file = open(cache_path)
+    except OSError:
+        return None
+    touch(cache_path)
+    return cache_file
+
+
+@contextlib.contextmanager
+def _text_cache_writer(cache_path):
+    # write_page(text) appends one JSON line to a temp file, renamed into place once every page is in.
+    # Left out (temp file removed) when extraction fails or the consumer stops early.
+    if cache_path is None:
+        yield lambda text: None
+        return
+
+    os.makedirs(TEXT_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=TEXT_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            yield lambda text: f.write(json.dumps(text) + "\n")
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _prune_text_cache()
+
+
+def _prune_text_cache(max_files=MAX_TEXT_CACHE_FILES):
+    # .json: the whole-document format used before the cache was written page by page
+    prune_files(TEXT_CACHE_DIR, (".jsonl", ".json"), max_files)
+
+
+# Backends
+
+def _pymupdf_extract(file_path, start, end):
+    import fitz
+    with fitz.open(file_path) as document:
+        for page_number in range(start, document.page_count if end is None else end):
+            yield document[page_number].get_text()
+
+
+def _pymupdf_count(file_path):
+    import fitz
+    with fitz.open(file_path) as document:
+        return document.page_count
+
+
+def _pypdf_extract(file_path, start, end):
+    from pypdf import PdfReader
+    pages = PdfReader(file_path).pages
+    for page_number in range(start, len(pages) if end is None else end):
+        yield pages[page_number].extract_text()
+
+
+def _pypdf_count(file_path):
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+
+def _docx2txt_extract(file_path, start, end):
+    import docx2txt
+    yield docx2txt.process(file_path)
+
+
+def _unstructured_extract(file_path, start, end):
+    from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+    yield "\n\n".join(doc.page_content for doc in UnstructuredWordDocumentLoader(file_path).load())
+
+
+register_extractor(".pdf", Extractor("pymupdf", "fitz", _pymupdf_extract, _pymupdf_count, priority=100))
+register_extractor(".pdf", Extractor("pypdf", "pypdf", _pypdf_extract, _pypdf_count, priority=50))
+register_extractor(".docx", Extractor("docx2txt", "docx2txt", _docx2txt_extract, priority=100))
+register_extractor(".docx", Extractor("unstructured", "unstructured", _unstructured_extract, priority=50))
+
+
+def benchmark_extractors(file_path, max_workers=None):
+    # Pages/sec of every installed backend for this file, serial and parallel, without the text cache
+    extension = os.path.splitext(file_path)[1].lower()
+    rows = []
+    for backend in available_extractors(extension):
+        for workers in (1, max_workers or os.cpu_count() or 1):
+            start = time.perf_counter()
+            pages = sum(1 for _ in extract_pages(file_path, backend=backend, max_workers=workers, use_cache=False))
+            seconds = time.perf_counter() - start
+            rows.append({
+                "backend": backend,
+                "workers": workers,
+                "pages": pages,
+                "seconds": round(seconds, 3),
+                "pages_per_sec": round(pages / seconds, 1) if seconds else 0.0,
+            })
+            if not get_extractor(file_path, backend).paged:
+                break
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m src.text_extractors notes.pdf [more files...]
+    import sys
+    for path in sys.argv[1:]:
+        for row in benchmark_extractors(path):
+            print(json.dumps({"file": os.path.basename(path), **row}))
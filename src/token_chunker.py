@@ -0,0 +1,72 @@
+import functools
+from langchain.docstore.document import Document
+
+# all-MiniLM-L6-v2 reads at most 256 word pieces, 2 of which are [CLS] and [SEP]
+TOKEN_CHUNK_SIZE = 254
+TOKEN_CHUNK_OVERLAP = 32
+
+
+@functools.lru_cache(maxsize=4)
+def get_tokenizer(model_name):
+    # Just the (fast, Rust) tokenizer, so worker processes don't have to load the model weights
+    # Imported here: transformers is only needed by the token chunker, not on every import of chunk_and_embed
+    from transformers import AutoTokenizer
+    if "/" not in model_name:
+        model_name = f"sentence-transformers/{model_name}"
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+
+class TokenTextChunker:
+    # Splits on the embedding model's own token boundaries, so every chunk fills but never
+    # overflows the model window. Same split_documents() interface as LangChain's splitters.
+
+    def __init__(self, tokenizer, chunk_size=TOKEN_CHUNK_SIZE, chunk_overlap=TOKEN_CHUNK_OVERLAP):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_documents(self, documents):
+        texts = [doc.page_content for doc in documents]
+        if not texts:
+            return []
+
+        # One batched tokenizer call for all pages, offsets map tokens back to the original text
+        encoded = self.tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            truncation=False,
+            verbose=False
+        )
+
+        chunks = []
+        for position, (doc, text) in enumerate(zip(documents, texts)):
+            offsets = encoded["offset_mapping"][position]
+            word_ids = encoded.word_ids(position)
+            for start, end in self._windows(word_ids):
+                chunk_text = text[offsets[start][0]:offsets[end - 1][1]].strip()
+                if chunk_text:
+                    chunks.append(Document(page_content=chunk_text, metadata=dict(doc.metadata)))
+        return chunks
+
+    def _windows(self, word_ids):
+        total = len(word_ids)
+        start = 0
+        while start < total:
+            end = min(start + self.chunk_size, total)
+            if end < total:
+                # Back off to a word boundary so words aren't cut into word pieces
+                boundary = end
+                while boundary > start + self.chunk_overlap + 1 and word_ids[boundary] == word_ids[boundary - 1]:
+                    boundary -= 1
+                end = boundary
+            yield start, end
+            if end >= total:
+                break
+
+            next_start = max(end - self.chunk_overlap, start + 1)
+            while next_start < end and word_ids[next_start] == word_ids[next_start - 1]:
+                next_start += 1
+            start = next_start
@@ -0,0 +1,65 @@
+import json
+from src.batch_generation import iter_json_objects, parse_json_items, dedupe_items, _split_count, _split_evenly
+
+
+class FixedEmbeddings:
+    # Maps each text to a preset vector
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+
+def test_objects_are_yielded_as_soon_as_they_complete():
+    stream = iter_json_objects(['[{"front": "a", ', '"back": "b"}, {"fro', 'nt": "c", "back": "d"}]'])
+    assert next(stream) == {"front": "a", "back": "b"}
+    assert list(stream) == [{"front": "c", "back": "d"}]
+
+
+def test_code_fences_and_surrounding_text_are_ignored():
+    text = 'Here you go:\n```json\n[{"front": "a", "back": "b"}]\n```\nGood luck!'
+    assert list(iter_json_objects([text])) == [{"front": "a", "back": "b"}]
+
+
+def test_broken_objects_are_skipped_at_end_of_stream():
+    text = '[{"front": "a", "back": "b"}, {"front": "broken", "back": }, {"front": "c", "back": "d"}'
+    assert list(iter_json_objects([text])) == [{"front": "a", "back": "b"}, {"front": "c", "back": "d"}]
+
+
+def test_truncated_stream_keeps_complete_objects():
+    pieces = ['[{"front": "a", "back": "b"},', ' {"front": "cut off']
+    assert list(iter_json_objects(pieces)) == [{"front": "a", "back": "b"}]
+
+
+def test_nested_objects_come_back_whole():
+    mcq = {"question": "q", "options": {"A": "1", "B": "2"}, "correct_option": "A"}
+    text = json.dumps([mcq])
+    assert list(iter_json_objects([text[:10], text[10:25], text[25:]])) == [mcq]
+
+
+def test_parse_json_items_applies_the_validator():
+    text = '[{"front": "a", "back": "b"}, {"front": ""}]'
+    assert parse_json_items(text, lambda item: bool(item.get("front")) and "back" in item) == [{"front": "a", "back": "b"}]
+
+
+def test_dedupe_keeps_the_first_of_similar_items():
+    items = ["cells", "cells again", "planets"]
+    embeddings = FixedEmbeddings({
+        "cells": [1.0, 0.0],
+        "cells again": [0.99, 0.05],
+        "planets": [0.0, 1.0],
+    })
+    assert dedupe_items(items, items, embeddings) == ["cells", "planets"]
+
+
+def test_dedupe_respects_the_threshold():
+    items = ["a", "b"]
+    embeddings = FixedEmbeddings({"a": [1.0, 0.0], "b": [0.8, 0.6]})
+    assert dedupe_items(items, items, embeddings, threshold=0.9) == ["a", "b"]
+    assert dedupe_items(items, items, embeddings, threshold=0.7) == ["a"]
+
+
+def test_work_is_split_evenly_across_calls():
+    assert _split_count(12, 5) == [3, 3, 2, 2, 2]
+    assert _split_evenly(list(range(7)), 3) == [[0, 1, 2], [3, 4], [5, 6]]
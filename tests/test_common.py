@@ -0,0 +1,47 @@
+import hashlib
+import os
+import time
+from src.common import hash_file, prune_files
+
+
+def make_files(directory, names, age_step=10):
+    # Oldest first: the first name gets the oldest modification time
+    now = time.time()
+    paths = []
+    for position, name in enumerate(names):
+        path = directory / name
+        path.write_text(name)
+        modified = now - (len(names) - position) * age_step
+        os.utime(path, (modified, modified))
+        paths.append(path)
+    return paths
+
+
+def test_hash_file_matches_sha256_of_the_bytes(tmp_path):
+    path = tmp_path / "notes.pdf"
+    path.write_bytes(b"x" * (3 * 1024 * 1024 + 7))
+    assert hash_file(path).hexdigest() == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_oldest_files_are_removed_first(tmp_path):
+    make_files(tmp_path, ["a.json", "b.json", "c.json", "d.json"])
+    prune_files(tmp_path, (".json",), max_files=2)
+    assert sorted(os.listdir(tmp_path)) == ["c.json", "d.json"]
+
+
+def test_other_suffixes_are_left_alone(tmp_path):
+    make_files(tmp_path, ["a.json", "b.json.tmp", "c.json"])
+    prune_files(tmp_path, (".json",), max_files=1)
+    assert sorted(os.listdir(tmp_path)) == ["b.json.tmp", "c.json"]
+
+
+def test_keep_is_never_removed_and_counts_toward_the_limit(tmp_path):
+    oldest, _, _ = make_files(tmp_path, ["a.pdf", "b.pdf", "c.pdf"])
+    prune_files(tmp_path, (".pdf",), max_files=2, keep=str(oldest))
+    assert sorted(os.listdir(tmp_path)) == ["a.pdf", "c.pdf"]
+
+
+def test_files_past_max_age_are_removed(tmp_path):
+    make_files(tmp_path, ["a.json", "b.json", "c.json"], age_step=60)
+    prune_files(tmp_path, (".json",), max_files=10, max_age_seconds=90)
+    assert sorted(os.listdir(tmp_path)) == ["c.json"]
@@ -0,0 +1,62 @@
+import math
+import numpy as np
+from src.lexical_index import LexicalIndex, tokenize, BM25_K1, BM25_B
+from src.hybrid_search import reciprocal_rank_fusion
+
+TEXTS = [
+    "mitochondria produce energy for the cell",
+    "the cell membrane controls what enters the cell",
+    "course cs-101 covers formulas like e=mc2",
+    "photosynthesis happens in chloroplasts",
+]
+
+
+def test_tokenize_keeps_compound_terms():
+    tokens = tokenize("See CS-101 and e=mc2, 3.14")
+    assert {"cs", "101", "cs-101", "e=mc2", "3.14"} <= set(tokens)
+
+
+def test_bm25_score_matches_the_formula():
+    index = LexicalIndex.build(TEXTS)
+    lengths = [len(tokenize(text)) for text in TEXTS]
+    average = sum(lengths) / len(lengths)
+    # "cell": twice in chunk 1, once in chunk 0
+    idf = math.log(1 + (len(TEXTS) - 2 + 0.5) / (2 + 0.5))
+
+    def expected(position, count):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[position] / average)
+        return idf * count * (BM25_K1 + 1) / (count + norm)
+
+    results = dict(index.search("cell", 10))
+    assert set(results) == {0, 1}
+    assert math.isclose(results[1], expected(1, 2), rel_tol=1e-5)
+    assert math.isclose(results[0], expected(0, 1), rel_tol=1e-5)
+
+
+def test_search_ranks_exact_terms_first_and_limits_k():
+    index = LexicalIndex.build(TEXTS)
+    assert index.search("cs-101", 1)[0][0] == 2
+    assert [position for position, _ in index.search("cell energy", 2)] == [0, 1]
+    assert index.search("unrelated words", 5) == []
+
+
+def test_saved_index_loads_memory_mapped(tmp_path):
+    index = LexicalIndex.build(TEXTS)
+    index.save(str(tmp_path))
+    loaded = LexicalIndex.load(str(tmp_path))
+    assert isinstance(loaded.weights, np.memmap)
+    assert loaded.search("chloroplasts", 3) == index.search("chloroplasts", 3)
+    assert LexicalIndex.load(str(tmp_path / "missing")) is None
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    dense = [1, 2, 3]
+    lexical = [3, 4, 1]
+    # 1 and 3 appear in both lists and beat 2 and 4 which appear once
+    fused = reciprocal_rank_fusion([dense, lexical], rrf_k=60)
+    assert fused[:2] == [1, 3]
+    assert set(fused) == {1, 2, 3, 4}
+
+
+def test_rrf_ties_break_by_position():
+    assert reciprocal_rank_fusion([[5, 7], [7, 5]]) == [5, 7]
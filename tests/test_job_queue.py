@@ -0,0 +1,92 @@
+import threading
+import time
+import pytest
+from src import job_queue
+from src.job_queue import submit_job, get_job, cancel_job, JobCancelled
+
+
+@pytest.fixture(autouse=True)
+def jobs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOBS_DIR", str(tmp_path / "jobs"))
+    return tmp_path / "jobs"
+
+
+def wait_for(job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get_job(job_id)
+        if job["status"] not in job_queue.ACTIVE_STATUSES:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def blocking_job(release):
+    def run(job):
+        job.report(progress=0.5, message="waiting")
+        while not release.wait(0.01):
+            job.report()
+        return "finished"
+    return run
+
+
+def test_result_and_progress_are_reported():
+    job_id = submit_job("test", lambda job, value: value * 2, 21)
+    job = wait_for(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == 42
+    assert job["progress"] == 1.0
+
+
+def test_same_dedupe_key_returns_the_running_job():
+    release = threading.Event()
+    first = submit_job("test", blocking_job(release), dedupe_key="same")
+    second = submit_job("test", blocking_job(release), dedupe_key="same")
+    other = submit_job("test", blocking_job(release), dedupe_key="other")
+    release.set()
+    assert first == second
+    assert other != first
+    assert wait_for(first)["result"] == "finished"
+    # Finished jobs don't absorb new submissions
+    assert submit_job("test", lambda job: None, dedupe_key="same") != first
+
+
+def test_cancel_stops_the_job_at_its_next_report():
+    release = threading.Event()
+    job_id = submit_job("test", blocking_job(release))
+    while get_job(job_id)["status"] != "running":
+        time.sleep(0.01)
+    assert cancel_job(job_id)
+    assert wait_for(job_id)["status"] == "cancelled"
+    assert not cancel_job(job_id)
+
+
+def test_failed_job_keeps_the_error():
+    def fail(job):
+        raise ValueError("no text")
+    job = wait_for(submit_job("test", fail))
+    assert job["status"] == "failed"
+    assert job["error"] == "no text"
+
+
+def test_finished_results_are_read_back_from_disk(jobs_dir):
+    job_id = submit_job("test", lambda job: {"answer": 1})
+    wait_for(job_id)
+    with job_queue._jobs_lock:
+        del job_queue._jobs[job_id]
+    assert get_job(job_id)["result"] == {"answer": 1}
+    assert (jobs_dir / f"{job_id}.json").exists()
+
+
+def test_job_files_are_pruned(jobs_dir):
+    for _ in range(4):
+        wait_for(submit_job("test", lambda job: None))
+    job_queue._prune_job_files(max_files=2)
+    assert len(list(jobs_dir.glob("*.json"))) == 2
+
+
+def test_report_raises_once_cancelled():
+    job = job_queue.Job("id", "test")
+    job._cancel_event.set()
+    with pytest.raises(JobCancelled):
+        job.report(progress=0.1)
@@ -0,0 +1,122 @@
+import threading
+import time
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+from benchmarks.mock_openai_server import start_mock_server, MockOpenAIHandler
+from src import llm_gateway
+from src.llm_gateway import get_llm, invoke_llm, stream_llm
+
+MESSAGES = [SystemMessage(content="Summarize the notes."), HumanMessage(content="STUDY CONTENT: photosynthesis turns light energy into chemical energy")]
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    # Starts the local mock API and points the gateway at it, with fresh clients and flights
+    servers = []
+
+    def start(**options):
+        server = start_mock_server(**options)
+        servers.append(server)
+        monkeypatch.setattr(llm_gateway, "BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+        return server
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm_gateway, "_clients", {})
+    monkeypatch.setattr(llm_gateway, "_flights", {})
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def server_stats(server):
+    return httpx.get(f"http://127.0.0.1:{server.server_port}/stats").json()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def test_rate_limited_request_is_retried_after_retry_after(mock_server):
+    server = mock_server(latency=0.0, error_rate=1.0, retry_after=1)
+    result = {}
+
+    def call():
+        start = time.monotonic()
+        result["text"] = invoke_llm(get_llm(), MESSAGES)
+        result["seconds"] = time.monotonic() - start
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    # First attempt gets a 429, the retry (a Retry-After later) goes through
+    wait_until(lambda: server_stats(server)["rate_limited"] == 1)
+    MockOpenAIHandler.error_rate = 0.0
+    thread.join(10)
+
+    assert "photosynthesis" in result["text"]
+    assert result["seconds"] >= 1.0
+    stats = server_stats(server)
+    assert stats["requests"] == 2
+    assert stats["rate_limited"] == 1
+
+
+def test_gives_up_after_max_attempts(mock_server, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "MAX_ATTEMPTS", 2)
+    server = mock_server(latency=0.0, error_rate=1.0, retry_after=0)
+
+    with pytest.raises(Exception) as error:
+        invoke_llm(get_llm(), MESSAGES)
+
+    assert getattr(error.value, "status_code", None) == 429
+    stats = server_stats(server)
+    assert stats["requests"] == 2
+    assert stats["rate_limited"] == 2
+
+
+def test_identical_concurrent_prompts_share_one_request(mock_server):
+    server = mock_server(latency=0.5)
+    start = threading.Barrier(5)
+    texts = []
+
+    def call():
+        start.wait()
+        texts.append(invoke_llm(get_llm(), MESSAGES, key="same-prompt"))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(texts) == 5
+    assert len(set(texts)) == 1
+    assert server_stats(server)["requests"] == 1
+
+
+def test_streamed_pieces_join_to_the_full_answer(mock_server):
+    mock_server(latency=0.0)
+    pieces = list(stream_llm(get_llm(), MESSAGES))
+    assert len(pieces) > 1
+    assert "".join(pieces).strip() == invoke_llm(get_llm(), MESSAGES).strip()
+
+
+def test_abandoned_stream_releases_its_concurrency_slot(mock_server, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "_concurrency", threading.BoundedSemaphore(1))
+    mock_server(latency=0.0, token_latency=0.01)
+
+    stream = stream_llm(get_llm(), MESSAGES, key="abandoned")
+    next(stream)
+    # The only slot is held while the stream is open
+    assert not llm_gateway._concurrency.acquire(blocking=False)
+    stream.close()
+
+    assert llm_gateway._concurrency.acquire(timeout=1)
+    llm_gateway._concurrency.release()
+    # Nothing is left waiting on the abandoned stream's flight, a new call makes its own request
+    assert "abandoned" not in llm_gateway._flights
+    assert "photosynthesis" in invoke_llm(get_llm(), MESSAGES, key="abandoned")
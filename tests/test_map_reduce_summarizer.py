@@ -0,0 +1,41 @@
+from src.map_reduce_summarizer import token_batches, _is_boundary
+
+
+class WordEncoding:
+    # One token per whitespace-separated word, instead of downloading a tiktoken vocabulary
+    def encode_ordinary_batch(self, texts):
+        return [text.split() for text in texts]
+
+
+def words(count, tag):
+    return " ".join(f"{tag}{i}" for i in range(count))
+
+
+def test_every_text_is_kept_in_order():
+    texts = [words(30, f"t{i}-") for i in range(20)]
+    batches = token_batches(texts, WordEncoding(), token_budget=100)
+    assert "\n\n".join(batches) == "\n\n".join(texts)
+
+
+def test_batches_stay_within_the_budget():
+    texts = [words(30, f"t{i}-") for i in range(20)]
+    for batch in token_batches(texts, WordEncoding(), token_budget=100):
+        assert len(batch.split()) <= 100
+
+
+def test_oversize_text_gets_its_own_batch():
+    big = words(500, "big")
+    batches = token_batches(["small one", big, "small two"], WordEncoding(), token_budget=100)
+    assert big in batches
+
+
+def test_edit_only_changes_nearby_batches():
+    # Content-defined boundaries: batches after the edited text line up again
+    texts = [words(10, f"t{i}-") for i in range(200)]
+    edited = list(texts)
+    edited[5] = words(10, "edited-")
+    before = token_batches(texts, WordEncoding(), token_budget=60)
+    after = token_batches(edited, WordEncoding(), token_budget=60)
+    assert any(_is_boundary(text) for text in texts[6:])
+    assert before[-1] == after[-1]
+    assert len(set(before) & set(after)) >= len(before) - 3
@@ -0,0 +1,36 @@
+import pytest
+from src.token_chunker import TokenTextChunker
+
+
+def windows(word_ids, chunk_size, chunk_overlap):
+    return list(TokenTextChunker(None, chunk_size, chunk_overlap)._windows(word_ids))
+
+
+def test_windows_cover_every_token():
+    word_ids = list(range(25))
+    spans = windows(word_ids, 10, 2)
+    assert spans[0][0] == 0 and spans[-1][1] == 25
+    for (_, end), (next_start, _) in zip(spans, spans[1:]):
+        assert next_start <= end
+
+
+def test_windows_advance_by_chunk_size_minus_overlap():
+    spans = windows(list(range(25)), 10, 2)
+    assert spans == [(0, 10), (8, 18), (16, 25)]
+
+
+def test_windows_do_not_split_words():
+    # Word 3 is tokenized into four word pieces around position 10
+    word_ids = [0, 1, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 5, 6, 7, 8]
+    for start, end in windows(word_ids, 10, 2):
+        assert start == 0 or word_ids[start] != word_ids[start - 1]
+        assert end == len(word_ids) or word_ids[end] != word_ids[end - 1]
+
+
+def test_short_input_is_one_window():
+    assert windows([0, 1, 2], 10, 2) == [(0, 3)]
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        TokenTextChunker(None, 10, 10)